@@ -0,0 +1,412 @@
+#!/usr/bin/python3-64 -X utf8
+"""
+Benchmark the sub_stats_script pipeline end to end against a synthetic,
+local stand-in for praw.Reddit. No network access or praw.ini is needed.
+
+Each scenario generates N submissions with M comments each, runs main()
+with the report written to a temporary folder, and reports the throughput,
+the wall time and peak traced memory of every stage, and the number of
+stand-in API requests made.
+
+The startup scenario times `sub_stats_script.py --version` in fresh
+interpreters and lists the slowest imports, against an optional budget.
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from rich.console import Console
+# Loaded up front so no stage times sub_stats_script's lazy imports
+import praw  # noqa: F401
+from rich import progress, table  # noqa: F401
+import sub_stats_script as sss
+
+
+__prog__ = 'bench_stats'
+__purpose__ = 'Benchmark the sub_stats_script pipeline with a fake Reddit'
+# scenario name: (submissions, comments per submission)
+SCENARIOS = {'1k': (10, 100), '100k': (1000, 100), '1m': (1000, 1000)}
+# The newest synthetic post is created at this UTC time (2021-01-01)
+EPOCH_END = 1609459200
+STAGES = ('submissions', 'trim', 'comments')
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'sub_stats_script.py')
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class FakeComment:
+    """The comment fields sub_stats_script reads from a praw Comment."""
+    __slots__ = ('id', 'author', 'score', 'total_awards_received',
+                 'created_utc', 'replies')
+
+    def __init__(self, com_id, author, score, awards, created_utc):
+        self.id = com_id
+        self.author = author
+        self.score = score
+        self.total_awards_received = awards
+        self.created_utc = created_utc
+        self.replies = FakeForest([])
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class FakeForest:
+    """A flat stand-in for a praw CommentForest."""
+
+    def __init__(self, comments: list, reddit=None):
+        self.comments = comments
+        self.reddit = reddit
+
+    def replace_more(self, limit: int = 32) -> list:
+        if self.reddit:
+            self.reddit.request()
+        return []
+
+    def list(self) -> list:
+        return list(self.comments)
+
+    def __iter__(self):
+        return iter(self.comments)
+
+    def __len__(self):
+        return len(self.comments)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class FakeSubmission:
+    """A praw Submission stand-in whose comments are generated on access."""
+
+    def __init__(self, reddit, index: int):
+        self.reddit = reddit
+        self.index = index
+        self.id = f'b{index:06d}'
+        self.name = self.fullname = f't3_{self.id}'
+        rng = random.Random(f'{reddit.seed}-s{index}')
+        self.created_utc = float(
+            EPOCH_END - index * reddit.days * 86400 // reddit.submissions)
+        self.title = f'Synthetic submission {index}'
+        self.num_comments = reddit.comments
+        self.score = rng.randint(0, 5000)
+        self.upvote_ratio = round(rng.uniform(0.5, 1.0), 2)
+        self.total_awards_received = rng.choice((0, 0, 0, 1, 2, 5))
+        self.permalink = f'/r/{reddit.name}/comments/{self.id}/'
+        self.author = f'author{rng.randrange(reddit.authors)}'
+        self.link_flair_text = None
+        self.author_flair_text = None
+        self.subreddit = reddit.name
+
+    @property
+    def comments(self) -> FakeForest:
+        reddit = self.reddit
+        rng = random.Random(f'{reddit.seed}-c{self.index}')
+        comments = [FakeComment(f'{self.id}c{j}',
+                                f'author{rng.randrange(reddit.authors)}',
+                                rng.randint(-5, 200),
+                                1 if rng.random() < 0.01 else 0,
+                                self.created_utc + rng.randrange(172800))
+                    for j in range(reddit.comments)]
+        return FakeForest(comments, reddit)
+
+    def __str__(self):
+        return self.id
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class FakeSubreddit:
+    """Serves the synthetic submissions newest first, 100 per page."""
+
+    def __init__(self, reddit, name: str):
+        self.reddit = reddit
+        self.display_name = name
+
+    def new(self, limit: int = 100, params: dict = None):
+        # Resume after the fullname 't3_b000123' like a real listing
+        after = (params or {}).get('after')
+        first = int(after[4:]) + 1 if after else 0
+        last = min(first + (limit or 0), self.reddit.submissions)
+        for index in range(first, last):
+            if (index - first) % 100 == 0:
+                self.reddit.request()
+            yield FakeSubmission(self.reddit, index)
+
+    def __str__(self):
+        return self.display_name
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class FakeReddit:
+    """
+    A local stand-in for praw.Reddit generating a deterministic subreddit.
+    Every listing page, submission fetch and replace_more counts as one
+    request and sleeps for the injected latency.
+    """
+
+    def __init__(self, submissions: int, comments: int, authors: int,
+                 days: int, latency: float = 0.0, seed: int = 0,
+                 name: str = 'bench'):
+        self.submissions = submissions
+        self.comments = comments
+        self.authors = authors
+        self.days = days
+        self.latency = latency
+        self.seed = seed
+        self.name = name
+        self.requests = 0
+
+    def request(self) -> None:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        return FakeSubreddit(self, name)
+
+    def submission(self, id: str = None) -> FakeSubmission:
+        self.request()
+        return FakeSubmission(self, int(str(id)[1:]))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class UnthrottledScheduler(sss.RequestScheduler):
+    """The stand-in has no rate limit, so never wait for a token."""
+
+    def acquire(self, tokens: int = 1) -> float:
+        self.count(tokens, 0.0)
+        return 0.0
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def timed_stage(name: str, func, stages: dict):
+    """
+    Wrap a sub_stats_script stage so its wall time and peak traced memory
+    are recorded into stages.
+    """
+    def wrapper(*a, **kw):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return func(*a, **kw)
+        finally:
+            stages[name] = {'seconds': time.perf_counter() - start,
+                            'peak_mb': tracemalloc.get_traced_memory()[1]
+                            / 2 ** 20}
+    return wrapper
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def run_scenario(name: str, submissions: int, comments: int,
+                 opts: argparse.Namespace) -> dict:
+    """
+    Run main() once against a FakeReddit and measure it.
+    :return: the measurements of the run
+    """
+    reddit = FakeReddit(submissions, comments, opts.authors, opts.days,
+                        opts.latency, opts.seed)
+    first = datetime.datetime.utcfromtimestamp(EPOCH_END - opts.days * 86400)
+    last = datetime.datetime.utcfromtimestamp(EPOCH_END)
+    stages = {}
+    originals = {stage: getattr(sss, f) for stage, f in
+                 zip(STAGES, ('sub_submissions', 'date_range_loop',
+                              'sub_comments'))}
+    scheduler = sss.RequestScheduler
+    with tempfile.TemporaryDirectory() as folder:
+        sss.args = sss.parse_args(
+            ['-r', reddit.name, '-s', str(submissions), '-c', '1000',
+             '-w', str(opts.workers), '-m', str(opts.max_top),
+             '-f', first.strftime('%y%m%d'), '-t', last.strftime('%y%m%d'),
+             '-out', os.path.join(folder, 'report.txt')]
+            + (['-q'] if opts.quiet else [])
+            + (['--approx', str(opts.approx)] if opts.approx else []))
+        sss.console = Console(file=io.StringIO(), width=120)
+        sss.rp = sss.console.print
+        # Render once so rich's own lazy imports are not traced in a stage
+        sss.console.rule(':bar_chart:')
+        sss.RequestScheduler = UnthrottledScheduler
+        for stage, func in originals.items():
+            setattr(sss, func.__name__, timed_stage(stage, func, stages))
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                sss.main(reddit)
+        finally:
+            total = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            sss.RequestScheduler = scheduler
+            for func in originals.values():
+                setattr(sss, func.__name__, func)
+    stages['report'] = {'seconds': total - sum(v['seconds']
+                                               for v in stages.values()),
+                        'peak_mb': None}
+    total_comments = submissions * comments
+    return {'scenario': name, 'submissions': submissions,
+            'comments': total_comments, 'authors': opts.authors,
+            'requests': reddit.requests, 'seconds': total,
+            'comments_per_sec': total_comments / total if total else 0.0,
+            'peak_mb': peak, 'stages': stages}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def run_startup(opts: argparse.Namespace) -> dict:
+    """
+    Time the CLI entry point in fresh interpreters, then run it once more
+    under -X importtime to find the slowest top level imports.
+    :return: the measurements of the runs
+    """
+    command = [sys.executable, SCRIPT, '--version']
+    runs = []
+    for _ in range(opts.startup_runs):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=True)
+        runs.append(time.perf_counter() - start)
+    traced = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:],
+                            capture_output=True, text=True, check=True)
+    imports = []
+    # import time: self [us] | cumulative | imported package
+    for line in traced.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and not fields[2].startswith('  ') \
+                and fields[1].strip().isdigit():
+            imports.append((fields[2].strip(), int(fields[1]) / 1000))
+    imports.sort(key=lambda x: -x[1])
+    return {'scenario': 'startup', 'runs': len(runs),
+            'median_ms': statistics.median(runs) * 1000,
+            'min_ms': min(runs) * 1000, 'budget_ms': opts.startup_budget,
+            'imports_ms': dict(imports[:10])}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def print_startup(result: dict) -> None:
+    budget = f", budget {result['budget_ms']:.0f} ms" \
+        if result['budget_ms'] is not None else ''
+    print(f"startup: {result['runs']} runs of --version, median "
+          f"{result['median_ms']:.1f} ms, min {result['min_ms']:.1f} ms"
+          f"{budget}")
+    for name, ms in result['imports_ms'].items():
+        print(f"  {name:<24} {ms:9.1f} ms")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def print_result(result: dict) -> None:
+    print(f"{result['scenario']}: {result['submissions']:,} submissions, "
+          f"{result['comments']:,} comments, {result['authors']:,} authors, "
+          f"{result['requests']:,} requests")
+    print(f"  total      {result['seconds']:9.3f} s  "
+          f"{result['peak_mb']:9.1f} MB peak  "
+          f"{result['comments_per_sec']:12,.0f} comments/s")
+    for stage, values in result['stages'].items():
+        peak = f"{values['peak_mb']:9.1f} MB peak" \
+            if values['peak_mb'] is not None else ''
+        print(f"  {stage:<10} {values['seconds']:9.3f} s  {peak}")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def main():
+    parser = argparse.ArgumentParser(
+        prog=__prog__,
+        description=__purpose__,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('scenarios',
+                        help=f'scenarios to run, any of {", ".join(SCENARIOS)}'
+                             ' or startup (default: 1k 100k)',
+                        metavar='scenario',
+                        nargs='*')
+    parser.add_argument('-s',
+                        '--submissions',
+                        help='run a custom scenario with this many submissions',
+                        type=int)
+    parser.add_argument('-c',
+                        '--comments',
+                        help='comments per submission of the custom scenario',
+                        type=int,
+                        default=100)
+    parser.add_argument('-a',
+                        '--authors',
+                        help='number of distinct authors',
+                        type=int,
+                        default=5000)
+    parser.add_argument('-d',
+                        '--days',
+                        help='days the submissions are spread over',
+                        type=int,
+                        default=30)
+    parser.add_argument('-l',
+                        '--latency',
+                        help='seconds of latency injected per request',
+                        type=float,
+                        default=0.0)
+    parser.add_argument('-w',
+                        '--workers',
+                        help='--workers passed to sub_stats_script',
+                        type=int,
+                        default=1)
+    parser.add_argument('-m',
+                        '--max-top',
+                        help='--max-top passed to sub_stats_script',
+                        type=int,
+                        default=10)
+    parser.add_argument('-q',
+                        '--quiet',
+                        help='run sub_stats_script headless (-q)',
+                        action='store_true')
+    parser.add_argument('--approx',
+                        help='--approx counters passed to sub_stats_script',
+                        type=int,
+                        nargs='?',
+                        const=sss.APPROX_COUNTERS,
+                        default=None)
+    parser.add_argument('--seed',
+                        help='seed of the synthetic data',
+                        type=int,
+                        default=0)
+    parser.add_argument('--startup-runs',
+                        help='interpreter starts timed by the startup scenario',
+                        metavar='N',
+                        type=int,
+                        default=10)
+    parser.add_argument('--startup-budget',
+                        help='exit with status 1 if the median startup is '
+                             'slower than this',
+                        metavar='MS',
+                        type=float)
+    parser.add_argument('--json',
+                        help='also write the results to this JSON file',
+                        metavar='<json_file>')
+    opts = parser.parse_args()
+    for name in opts.scenarios:
+        if name not in SCENARIOS and name != 'startup':
+            parser.error(f'unknown scenario {name}, choose from '
+                         f'{", ".join(SCENARIOS)}, startup')
+
+    names = opts.scenarios or ['1k', '100k']
+    runs = [(name, *SCENARIOS[name]) for name in names if name in SCENARIOS]
+    if opts.submissions:
+        runs = [('custom', opts.submissions, opts.comments)]
+    results = []
+    if 'startup' in names:
+        results.append(run_startup(opts))
+        print_startup(results[-1])
+    for name, submissions, comments in runs:
+        results.append(run_scenario(name, submissions, comments, opts))
+        print_result(results[-1])
+    if opts.json:
+        with open(opts.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if 'startup' in names and opts.startup_budget is not None \
+            and results[0]['median_ms'] > opts.startup_budget:
+        sys.exit(1)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+if __name__ == '__main__':
+    main()
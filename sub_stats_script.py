@@ -6,23 +6,105 @@ TODO: Query single submissions by subreddit and ID; retrieve comments from it
 TODO: Overwrite file error handling
 TODO: Interactive use with user prompts
 TODO: Individual user login credentials and stats
-TODO: Suppress Table Output
 TODO: Error Check dates
 TODO: Add Max Entry cap of 1000 to match arg
-TODO: Output sub data to file, update file, and retrieve the same data from it
 TODO: Check for praw.ini
 TODO: Add details on pre-trimmed posts and post trimmed posts
 """
 
+from __future__ import annotations
+import abc
 import argparse
-from collections import defaultdict as dd
+from array import array
+from collections import Counter, defaultdict as dd, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextlib
+import csv
 import datetime
-import praw
-from praw import exceptions
-from rich.traceback import install
-from rich.console import Console
-from rich.progress import track
-from rich.table import Table
+import hashlib
+import heapq
+import importlib
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module, the peak RSS is reported as null
+    resource = None
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access. The
+    import system's locks make the first access safe from any thread.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: the module name
+        """
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr: str):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+
+# praw and rich are most of the startup time, load them (and the profilers)
+# when first used so -h, --version and --from-dump runs don't pay for them
+praw = LazyModule('praw')
+prawcore = LazyModule('prawcore')
+requests = LazyModule('requests')
+cProfile = LazyModule('cProfile')
+pstats = LazyModule('pstats')
+numpy = LazyModule('numpy')
+pyarrow = LazyModule('pyarrow')
+pyarrow_parquet = LazyModule('pyarrow.parquet')
+rich_console = LazyModule('rich.console')
+rich_progress = LazyModule('rich.progress')
+rich_table = LazyModule('rich.table')
+rich_traceback = LazyModule('rich.traceback')
+
+
+class LazyConsole:
+    """
+    Stands in for the rich Console and creates it on first use, so rich is
+    not imported before anything is printed.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param kwargs: the rich Console arguments
+        """
+        self.kwargs = kwargs
+        self.console = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        :return: the rich Console, created on the first call
+        """
+        if self.console is None:
+            with self.lock:
+                if self.console is None:
+                    self.console = rich_console.Console(**self.kwargs)
+        return self.console
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        return repr(self.get())
+
+
 MAIN_COLOR = '#dbbcc3'
 B_COLOR = 'blue'
 C_COLOR = 'cyan'
@@ -31,239 +113,3010 @@ M_COLOR = 'magenta'
 O_COLOR = '#ff8b3d'
 P_COLOR = '#a45ee5'
 R_COLOR = '#ff4500'
+# Reddit allows 100 OAuth requests per minute per client
+API_RATE = 100 / 60
+API_BURST = 10
+CACHE_FILE = './output/sub_stats_cache.db'
+# Seconds a cache write waits for the other pipelines of a batch
+CACHE_TIMEOUT = 60
+# Counters per author leaderboard of --approx
+APPROX_COUNTERS = 10000
+# Comments expected with a post's first page of comments, and from each
+# MoreComments expansion, to split --comment-budget across the posts
+TREE_COMMENTS = 500
+MORE_COMMENTS = 100
+# Timestamp batches of this size and up are bucketed with NumPy, if installed
+NUMPY_BATCH = 4096
+# The date ordinal of the UTC epoch, day 0
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+            'Saturday', 'Sunday')
+# Seconds between the checkpoints of --checkpoint and --resume
+CHECKPOINT_SECONDS = 60
+# Newest comment IDs of a subreddit's comment stream kept by --watch to find
+# where the last tick stopped
+SEEN_COMMENTS = 300
+# Retried request failures: seconds of the first backoff and the longest one
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+
+__author__ = 'u/Red_BW <https://www.reddit.com/user/Red_BW/>'
+__license__ = 'MIT'
+__origin_date = '2021-01-02'
+__prog__ = 'sub_stats_script'
+__purpose__ = 'A Query Script for Reddit to extract various Data Points'
+__version__ = '0.9.10'
+__version_date__ = '2021-01-05'
+__version_info__ = tuple(int(i) for i in __version__.split('.') if i.isdigit())
+# Initialize the console globally; -e replaces it with a recording one
+console = LazyConsole()
+export = None
+# Set once importing numpy failed, so count_hours stops trying
+numpy_missing = False
+# The RunProfiler of the run, main() starts a new one
+profiler = None
+# Set on Ctrl-C, which only reaches the main thread, to stop the pipelines
+interrupted = threading.Event()
+# Get and format today's date globally
+today_raw = datetime.datetime.today()
+today = today_raw.strftime('%y%m%d')
+ver = f'{__prog__} {__version__} ({__version_date__})'
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def rp(*objects, **kwargs) -> None:
+    """
+    Print to the global console, or log to it with -l, then stream what it
+    recorded to the -e export file.
+    """
+    if args.logging:
+        # Report the caller of rp as the logged source line
+        console.log(*objects, _stack_offset=2, **kwargs)
+    else:
+        console.print(*objects, **kwargs)
+    if export:
+        export.flush()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class ConsoleExport:
+    """
+    Streams a recording console to the -e file as the run goes: whatever
+    was recorded since the last flush is exported, appended and cleared, so
+    the recording never grows past a few messages.
+    """
+
+    def __init__(self, recording: LazyConsole, path: str, fmt: str):
+        """
+        :param recording: a console created with record=True
+        :param path: the export file
+        :param fmt: txt or html
+        """
+        self.console = recording
+        self.path = path
+        self.fmt = fmt
+        self.lock = threading.Lock()
+        self.file = open(path, 'w', encoding='utf-8')
+        self.tail = ''
+        if fmt == 'html':
+            # The page around the code is written once, the code in chunks
+            theme = rich_console.DEFAULT_TERMINAL_THEME
+            head, self.tail = rich_console.CONSOLE_HTML_FORMAT.split('{code}')
+            self.file.write(head.format(
+                stylesheet='', foreground=theme.foreground_color.hex,
+                background=theme.background_color.hex))
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.fmt == 'html':
+                self.file.write(self.console.export_html(
+                    clear=True, inline_styles=True, code_format='{code}'))
+            else:
+                self.file.write(self.console.export_text(clear=True))
+
+    def close(self) -> None:
+        self.flush()
+        self.file.write(self.tail)
+        self.file.close()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def rich_excepthook(*exc_info) -> None:
+    """
+    Install the rich traceback handler on the first uncaught exception
+    instead of at startup, then let it print this one.
+    """
+    rich_traceback.install(console=console.console)
+    sys.excepthook(*exc_info)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def transient_errors() -> tuple:
+    """
+    :return: the prawcore exceptions worth retrying: server errors (5xx),
+    throttling (429) and network errors
+    """
+    return (prawcore.exceptions.ServerError,
+            prawcore.exceptions.TooManyRequests,
+            prawcore.exceptions.RequestException)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def epoch_date(created_utc: int, fmt: str = '%y%m%d') -> str:
+    """
+    :param created_utc: a UTC epoch timestamp
+    :param fmt: the strftime format
+    :return: the formatted UTC date
+    """
+    return datetime.datetime.utcfromtimestamp(created_utc).strftime(fmt)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def date_epoch(yymmdd: int) -> int:
+    """
+    :param yymmdd: a date as the YYMMDD integer used by --from/--to-date,
+    always read as 20YY
+    :return: the UTC epoch timestamp of the start of that day
+    """
+    day = datetime.datetime(2000 + yymmdd // 10000, yymmdd // 100 % 100,
+                            yymmdd % 100, tzinfo=datetime.timezone.utc)
+    return int(day.timestamp())
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def date_window() -> tuple:
+    """
+    :return: the (start, end) UTC epoch bounds of --from-date to --to-date,
+    end exclusive
+    """
+    return date_epoch(args.from_date), date_epoch(args.to_date) + 86400
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def iso_day(day: int) -> str:
+    """
+    :param day: a UTC epoch day (timestamp // 86400)
+    :return: the date as YYYY-MM-DD
+    """
+    return datetime.date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def epoch_day(date: str) -> int:
+    """
+    :param date: a date as YYYY-MM-DD
+    :return: the UTC epoch day
+    """
+    return datetime.date.fromisoformat(date).toordinal() - EPOCH_ORDINAL
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def count_hours(timestamps, counts: dict) -> None:
+    """
+    Bucket a batch of timestamps by UTC epoch hour (timestamp // 3600) with
+    integer arithmetic; dates are only formatted by activity() when the
+    report is written. Large batches are bucketed with NumPy if installed.
+    :param timestamps: a sequence of UTC epoch timestamps
+    :param counts: the {epoch hour: count} counters to add the batch to
+    """
+    global numpy_missing
+    if len(timestamps) >= NUMPY_BATCH and not numpy_missing:
+        try:
+            hours, sizes = numpy.unique(
+                numpy.asarray(timestamps, dtype=numpy.int64) // 3600,
+                return_counts=True)
+        except ImportError:
+            numpy_missing = True
+        else:
+            for hour, size in zip(hours.tolist(), sizes.tolist()):
+                counts[hour] += size
+            return
+    for hour, size in Counter([int(t) // 3600 for t in timestamps]).items():
+        counts[hour] += size
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def activity(hours: dict) -> tuple:
+    """
+    Roll counts per UTC epoch hour up into the report histograms.
+    :param hours: a {epoch hour: count} dict from count_hours
+    :return: the counts per date (YYYY-MM-DD), per hour of the day (HH:00,
+    in clock order) and per weekday (in calendar order)
+    """
+    days = dd(int)
+    by_hour, by_weekday = [0] * 24, [0] * 7
+    for hour, count in hours.items():
+        day = hour // 24
+        days[day] += count
+        by_hour[hour % 24] += count
+        # The epoch, day 0, was a Thursday
+        by_weekday[(day + 3) % 7] += count
+    return ({iso_day(day): count for day, count in days.items()},
+            {f'{hour:02}:00': count for hour, count in enumerate(by_hour)},
+            dict(zip(WEEKDAYS, by_weekday)))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def submissions_arg(value: str):
+    """
+    argparse type of --submissions: a number or 'auto'.
+    """
+    if value == 'auto':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid value: '{value}' (use a "
+                                         f"number or 'auto')")
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def progress(sequence, total: int):
+    """
+    Wrap a loop in a rich progress bar, unless headless (-q) or several
+    subreddit pipelines run at once (rich can only show one live display at
+    a time).
+    :param sequence: the iterable being looped over
+    :param total: its expected length
+    :return: an iterable over sequence
+    """
+    if args.quiet or args.batch_workers > 1:
+        return sequence
+    return rich_progress.track(sequence, total=total)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def sub_path(path: str, subreddit: str) -> str:
+    """
+    Name a per subreddit file. A {subreddit} placeholder is filled in; with
+    several subreddits and no placeholder the name gets a _subreddit suffix.
+    :param path: the file name given on the command line
+    :param subreddit: the subreddit name
+    :return: the file name for this subreddit
+    """
+    if '{subreddit}' in path:
+        return path.replace('{subreddit}', subreddit)
+    if len(args.reddit) > 1:
+        root, ext = os.path.splitext(path)
+        return f'{root}_{subreddit}{ext}'
+    return path
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+@contextlib.contextmanager
+def atomic_path(path: str):
+    """
+    Write a file under a temporary name and move it over the path once it is
+    complete, so a reader never sees a half written report.
+    :param path: the file to write
+    :return: a context manager giving the temporary file name to write to
+    """
+    temp = f'{path}.tmp'
+    try:
+        yield temp
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    os.replace(temp, path)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def read_subreddits(path: str) -> list:
+    """
+    :param path: a text file with one subreddit per line ('#' comments and
+    blank lines are ignored)
+    :return: the subreddit names
+    """
+    with open(path, encoding='utf-8') as f:
+        names = (line.split('#')[0].strip() for line in f)
+        return [name for name in names if name]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class SubmissionTable:
+    """
+    A column store of submissions. Numbers are kept in typed arrays, dates as
+    integer UTC epochs and author names are interned, so a row costs a few
+    machine words plus its title and permalink. Rows are addressed by index;
+    filtering returns index lists or new tables.
+    """
+    __slots__ = ('created', 'num_comments', 'score', 'ratio', 'awards',
+                 'title', 'permalink', 'author', 'id')
+
+    def __init__(self):
+        self.created, self.num_comments = array('q'), array('q')
+        self.score, self.awards = array('q'), array('q')
+        self.ratio = array('d')
+        self.title, self.permalink, self.author, self.id = [], [], [], []
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def append(self, created_utc: int, title: str, num_com: int, score: int,
+               ratio: float, award_count: int, permalink: str, author: str,
+               sub_id: str) -> None:
+        """
+        Add a submission from its raw fields (the order used by the cache and
+        dump files).
+        """
+        self.created.append(int(created_utc))
+        self.title.append(title)
+        self.num_comments.append(num_com)
+        self.score.append(score)
+        self.ratio.append(ratio)
+        self.awards.append(award_count)
+        self.permalink.append(permalink)
+        self.author.append(sys.intern(str(author)))
+        self.id.append(sub_id)
+
+    def fields(self, index: int) -> tuple:
+        """
+        :param index: the row index
+        :return: the raw fields of a row, in append order
+        """
+        return (self.created[index], self.title[index],
+                self.num_comments[index], self.score[index], self.ratio[index],
+                self.awards[index], self.permalink[index], self.author[index],
+                self.id[index])
+
+    def take(self, indices) -> 'SubmissionTable':
+        """
+        :param indices: row indices, in the order wanted
+        :return: a new table of those rows
+        """
+        table = SubmissionTable()
+        for index in indices:
+            table.append(*self.fields(index))
+        return table
+
+    def between(self, start: int, end: int) -> list:
+        """
+        :param start: oldest epoch timestamp (inclusive)
+        :param end: newest epoch timestamp (exclusive)
+        :return: the indices of the rows created within [start, end)
+        """
+        return [i for i, created in enumerate(self.created)
+                if start <= created < end]
+
+    def group_sum(self, column: str) -> dict:
+        """
+        :param column: a numeric column name
+        :return: the column summed per author
+        """
+        sums = dd(int)
+        for author, value in zip(self.author, getattr(self, column)):
+            sums[author] += value
+        return sums
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def top_k(items, k: int, key=None) -> list:
+    """
+    Select a leaderboard in a single pass with a bounded heap instead of
+    sorting everything, O(n log k).
+    :param items: an iterable of (key, value) pairs, e.g. dict.items()
+    :param k: the number of entries to keep
+    :param key: an optional sort key, smallest first; by default the largest
+    value first with ties broken by the smallest key
+    :return: the top k items, best first
+    """
+    if key is None:
+        key = lambda item: (-item[1], item[0])
+    return heapq.nsmallest(k, items, key=key)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def date_range_loop(submissions: SubmissionTable,
+                    reached: bool = False) -> SubmissionTable:
+    """
+    Loop through the Submissions and discard everything not within the date
+    range. Return them as a new table, oldest first.
+    :param submissions: All posts retrieved
+    :param reached: True if retrieval already stopped at the from date
+    :return: Trimmed table of only posts within the requested date range
+    """
+    rp(f'\nAnalyzing dates and attempting to clean the submissions list to the'
+       f' range specified: From: {args.from_date} To: {args.to_date}')
+    start, end = date_window()
+    if submissions:
+        oldest, newest = min(submissions.created), max(submissions.created)
+        rp(f'Oldest submission date is {epoch_date(oldest)}, newest '
+           f'submission date is {epoch_date(newest)}')
+        # Warn the customer if there are no posts older than the from date
+        if oldest >= start + 86400 and not reached:
+            rp('\nWarning: Not enough posts were retrieved to reach the '
+               f'requested from date: {args.from_date}\n', style=R_COLOR)
+    rp(f'Starting submission post trimming.')
+    # Keep only the posts within the date range, oldest first
+    rows = submissions.between(start, end)
+    rows.sort(key=submissions.created.__getitem__)
+    trimmed = submissions.take(rows)
+    rp(f'{len(submissions)} submissions were retrieved. Trimmed down to'
+       f' {len(trimmed)} submissions.')
+    # Check the number of posts. If trimmed to 0, notify customer and exit
+    if not trimmed:
+        rp('Attention: The number of posts was trimmed to 0. Please adjust '
+           'the date range or number of submissions to retrieve, to continue. '
+           '\n Exiting Application.', style=R_COLOR)
+        exit()
+    rp(f'Oldest submission date is {epoch_date(trimmed.created[0])}, newest'
+       f' submission date is {epoch_date(trimmed.created[-1])}')
+    return trimmed
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def settled_days(submissions: SubmissionTable, reached: bool) -> set:
+    """
+    The days that can be rolled up: every post submitted that day is in the
+    table and settled. The oldest day may be cut short by --submissions
+    unless the from date was reached, and a day settles --refresh-hours
+    after it ends.
+    :param submissions: the trimmed SubmissionTable, oldest first
+    :param reached: True if the listing went past the from date
+    :return: the settled UTC epoch days
+    """
+    if not len(submissions):
+        return set()
+    cutoff = time.time() - args.refresh_hours * 3600
+    oldest = submissions.created[0] // 86400
+    return {day for day in {created // 86400 for created in submissions.created}
+            if (day + 1) * 86400 <= cutoff and (reached or day > oldest)}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class SubCache:
+    """
+    An SQLite store of previously retrieved submissions and comments keyed by
+    their reddit ID. A post is 'settled' once it was fetched at least
+    --refresh-hours after it was created; settled posts are not re-fetched,
+    and their comments once they were fetched that late as well. The spans
+    of the listing paged through are kept per subreddit, so paging only
+    stops early where every post is known to be cached. With --rollups it
+    also keeps the comment counters of every settled day, keyed by the day
+    the posts were submitted.
+    """
+
+    def __init__(self, path: str, refresh_hours: float):
+        """
+        :param path: the SQLite database file
+        :param refresh_hours: age in hours after which a post stops changing
+        """
+        self.path = path
+        self.refresh = int(refresh_hours * 3600)
+        # The pipelines of a batch each open the file; a write waits for the
+        # others' instead of failing at once
+        self.db = sqlite3.connect(path, timeout=CACHE_TIMEOUT)
+        self.pending = 0
+        self.db.executescript(
+            'CREATE TABLE IF NOT EXISTS submissions (id TEXT PRIMARY KEY, '
+            'subreddit TEXT, created_utc INTEGER, title TEXT, num_comments '
+            'INTEGER, score INTEGER, ratio REAL, awards INTEGER, permalink '
+            'TEXT, author TEXT, fetched_utc INTEGER, comments_limit INTEGER, '
+            'comments_fetched_utc INTEGER);'
+            'CREATE INDEX IF NOT EXISTS submissions_created ON submissions '
+            '(subreddit, created_utc);'
+            'CREATE TABLE IF NOT EXISTS listings (subreddit TEXT, oldest '
+            'INTEGER, newest INTEGER);'
+            'CREATE TABLE IF NOT EXISTS comments (id TEXT PRIMARY KEY, '
+            'submission_id TEXT, author TEXT, score INTEGER, awards INTEGER, '
+            'created_utc INTEGER);'
+            'CREATE INDEX IF NOT EXISTS comments_submission ON comments '
+            '(submission_id);'
+            'CREATE TABLE IF NOT EXISTS rollup_days (subreddit TEXT, day TEXT,'
+            ' comments_limit INTEGER, comments INTEGER, PRIMARY KEY '
+            '(subreddit, day));'
+            'CREATE TABLE IF NOT EXISTS rollups (subreddit TEXT, day TEXT, '
+            'counter TEXT, key TEXT, value INTEGER, PRIMARY KEY (subreddit, '
+            'day, counter, key));')
+
+    def is_settled(self, sub_id: str) -> bool:
+        """
+        :param sub_id: the submission ID
+        :return: True if the cached copy of the post no longer needs a refresh
+        """
+        row = self.db.execute(
+            'SELECT fetched_utc - created_utc FROM submissions WHERE id = ?',
+            (sub_id,)).fetchone()
+        return row is not None and row[0] >= self.refresh
+
+    def covered(self, subreddit: str, created_utc: int, start: int) -> bool:
+        """
+        :param subreddit: the subreddit name
+        :param created_utc: the creation time of a post in the listing
+        :param start: the oldest creation time wanted
+        :return: True if one paged span holds every post from start up to
+        created_utc, so the rest can be read from the cache
+        """
+        return self.db.execute(
+            'SELECT 1 FROM listings WHERE subreddit = ? AND oldest <= ? AND '
+            'newest >= ?', (subreddit.lower(), start, created_utc)
+        ).fetchone() is not None
+
+    def put_listing(self, subreddit: str, oldest: int, newest: int) -> None:
+        """
+        Record a span of the listing paged through without a gap, merged
+        with the spans it overlaps.
+        :param subreddit: the subreddit name
+        :param oldest: the creation time of the oldest post listed
+        :param newest: the creation time of the newest post listed
+        """
+        subreddit = subreddit.lower()
+        rows = self.db.execute(
+            'SELECT MIN(oldest), MAX(newest) FROM listings WHERE subreddit = ? '
+            'AND oldest <= ? AND newest >= ?',
+            (subreddit, newest, oldest)).fetchone()
+        oldest = min(oldest, rows[0]) if rows[0] is not None else oldest
+        newest = max(newest, rows[1]) if rows[1] is not None else newest
+        self.db.execute('DELETE FROM listings WHERE subreddit = ? AND oldest '
+                        '>= ? AND newest <= ?', (subreddit, oldest, newest))
+        self.db.execute('INSERT INTO listings VALUES (?, ?, ?)',
+                        (subreddit, oldest, newest))
+        self.db.commit()
+
+    def put_submission(self, subreddit: str, sub) -> None:
+        """
+        Insert or refresh a submission, keeping any cached comments if the
+        post was already settled.
+        :param subreddit: the subreddit name the post was listed under
+        :param sub: a praw Submission
+        """
+        self.db.execute(
+            'INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '
+            'NULL, NULL) ON CONFLICT(id) DO UPDATE SET num_comments = '
+            'excluded.num_comments, score = excluded.score, ratio = '
+            'excluded.ratio, awards = excluded.awards, fetched_utc = '
+            'excluded.fetched_utc',
+            (sub.id, subreddit.lower(), int(sub.created_utc), sub.title,
+             int(sub.num_comments), int(sub.score), float(sub.upvote_ratio),
+             int(sub.total_awards_received), sub.permalink, str(sub.author),
+             int(time.time())))
+        # Commit a page at a time, holding the write lock only briefly
+        self.pending += 1
+        if self.pending % 100 == 0:
+            self.db.commit()
+
+    def submissions_from(self, subreddit: str, created_utc: int, start: int,
+                         limit: int) -> list:
+        """
+        :param subreddit: the subreddit name
+        :param created_utc: newest creation time to return (inclusive)
+        :param start: oldest creation time to return (inclusive)
+        :param limit: maximum number of submissions
+        :return: cached submissions, newest first, as SubmissionTable.append
+        argument tuples
+        """
+        rows = self.db.execute(
+            'SELECT created_utc, title, num_comments, score, ratio, awards, '
+            'permalink, author, id FROM submissions WHERE subreddit = ? AND '
+            'created_utc <= ? AND created_utc >= ? ORDER BY created_utc DESC '
+            'LIMIT ?', (subreddit.lower(), created_utc, start, limit))
+        return rows.fetchall()
+
+    def comments(self, sub_id: str, limit: int):
+        """
+        :param sub_id: the submission ID
+        :param limit: the replace_more limit the caller wants
+        :return: cached (ID, author, score, awards, created_utc) comment
+        tuples, or None if the post has to be fetched again
+        """
+        # Comments fetched while the post was young are fetched again, even
+        # after the post itself settled
+        row = self.db.execute(
+            'SELECT comments_limit, comments_fetched_utc - created_utc FROM '
+            'submissions WHERE id = ?', (sub_id,)).fetchone()
+        if row is None or row[0] is None or row[0] < limit \
+                or row[1] < self.refresh:
+            return None
+        return self.db.execute(
+            'SELECT id, author, score, awards, created_utc FROM comments '
+            'WHERE submission_id = ?', (sub_id,)).fetchall()
+
+    def put_comments(self, sub_id: str, records: list, limit: int) -> None:
+        """
+        Replace the cached comments of a submission.
+        :param sub_id: the submission ID
+        :param records: (ID, author, score, awards, created_utc) tuples
+        :param limit: the replace_more limit used to retrieve them
+        """
+        self.db.execute('DELETE FROM comments WHERE submission_id = ?',
+                        (sub_id,))
+        self.db.executemany(
+            'INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?)',
+            ((com_id, sub_id, author, score, awards, created_utc)
+             for com_id, author, score, awards, created_utc in records))
+        self.db.execute('UPDATE submissions SET comments_limit = ?, '
+                        'comments_fetched_utc = ? WHERE id = ?',
+                        (limit, int(time.time()), sub_id))
+        self.db.commit()
+
+    def rollup_days(self, subreddit: str, limit: int) -> set:
+        """
+        :param subreddit: the subreddit name
+        :param limit: the replace_more limit the caller wants
+        :return: the UTC epoch days with a rollup of at least that limit
+        """
+        rows = self.db.execute(
+            'SELECT day FROM rollup_days WHERE subreddit = ? AND '
+            'comments_limit >= ?', (subreddit.lower(), limit))
+        return {epoch_day(day) for day, in rows}
+
+    def rollup(self, subreddit: str, days: list) -> CommentStats:
+        """
+        Merge the daily rollups of several days in SQL.
+        :param subreddit: the subreddit name
+        :param days: the UTC epoch days to merge
+        :return: the CommentStats of the comments on the posts of those days
+        """
+        stats = CommentStats()
+        if not days:
+            return stats
+        marks = ', '.join('?' * len(days))
+        params = (subreddit.lower(), *map(iso_day, days))
+        rows = self.db.execute(
+            f'SELECT counter, key, SUM(value) FROM rollups WHERE subreddit = ?'
+            f' AND day IN ({marks}) GROUP BY counter, key', params)
+        for counter, key, value in rows:
+            # The key column is text, the epoch hours are stored as digits
+            if counter == 'com_hours':
+                key = int(key)
+            getattr(stats, counter)[key] = value
+        stats.count = self.db.execute(
+            f'SELECT SUM(comments) FROM rollup_days WHERE subreddit = ? AND '
+            f'day IN ({marks})', params).fetchone()[0] or 0
+        return stats
+
+    def put_rollup(self, subreddit: str, day: int, stats: CommentStats,
+                   limit: int) -> None:
+        """
+        Replace the rollup of a day.
+        :param subreddit: the subreddit name
+        :param day: the UTC epoch day the posts were submitted on
+        :param stats: the CommentStats of the comments on that day's posts
+        :param limit: the replace_more limit used to retrieve them
+        """
+        subreddit, day = subreddit.lower(), iso_day(day)
+        self.db.execute('DELETE FROM rollups WHERE subreddit = ? AND day = ?',
+                        (subreddit, day))
+        self.db.executemany(
+            'INSERT INTO rollups VALUES (?, ?, ?, ?, ?)',
+            ((subreddit, day, counter, key, value)
+             for counter in ('tot_scores', 'com_awards', 'com_counts',
+                             'com_hours')
+             for key, value in getattr(stats, counter).items()))
+        self.db.execute('INSERT OR REPLACE INTO rollup_days VALUES '
+                        '(?, ?, ?, ?)', (subreddit, day, limit, stats.count))
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class DumpWriter:
+    """
+    Records the raw submission and comment fields of a run as JSON lines so
+    the run can be replayed later with --from-dump. The first line holds the
+    run details, then every submission is a list starting with "s" and every
+    comment a list starting with "c".
+    """
+
+    def __init__(self, path: str, subreddit: str):
+        """
+        :param path: the dump file to (over)write
+        :param subreddit: the subreddit being recorded
+        """
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(json.dumps({'subreddit': subreddit,
+                                    'comments': args.comments,
+                                    'from_date': args.from_date,
+                                    'to_date': args.to_date,
+                                    'version': __version__,
+                                    'date': today}) + '\n')
+
+    def put_submission(self, fields: tuple) -> None:
+        """
+        :param fields: the SubmissionTable.append arguments of a submission
+        """
+        self.file.write(json.dumps(['s', *fields]) + '\n')
+
+    def put_comments(self, sub_id: str, records: list) -> None:
+        """
+        :param sub_id: the submission ID
+        :param records: (ID, author, score, awards, created_utc) tuples
+        """
+        self.file.writelines(json.dumps(['c', sub_id, *record]) + '\n'
+                             for record in records)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def read_dump(path: str) -> tuple:
+    """
+    Load a file recorded with --dump.
+    :param path: the dump file
+    :return: the run details dict, a list of SubmissionTable.append argument
+    tuples (newest first) and a dict of comment tuples by submission ID
+    """
+    with open(path, encoding='utf-8') as f:
+        info = json.loads(f.readline())
+        posts, comments = [], dd(list)
+        for line in f:
+            record = json.loads(line)
+            if record[0] == 's':
+                posts.append(tuple(record[1:]))
+            elif record[0] == 'c':
+                comments[record[1]].append(tuple(record[2:]))
+    posts.sort(key=lambda x: x[0], reverse=True)
+    return info, posts, comments
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class TokenBucket:
+    """
+    A thread safe token bucket shared by every worker so the combined request
+    rate of all threads stays inside the Reddit API limit.
+    """
+
+    def __init__(self, rate: float = API_RATE, capacity: int = API_BURST):
+        """
+        :param rate: tokens added per second
+        :param capacity: maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Block until the requested tokens are available and take them.
+        :param tokens: number of requests about to be made
+        :return: seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class RequestScheduler(TokenBucket):
+    """
+    The request layer shared by every pipeline and worker. Each HTTP request
+    takes a token as it is sent; after each response the token rate is
+    re-fitted to the remaining quota and reset time reddit reports in its
+    rate limit headers, so the run uses the whole budget without tripping it.
+    Transient failures (5xx, 429, network errors) are retried with jittered
+    exponential backoff. Also counts requests, retries and waiting time for
+    the end of run report.
+    """
+
+    def __init__(self, reddit: praw.Reddit, retries: int = 5):
+        """
+        :param reddit: the praw.Reddit whose rate limit headers are read
+        :param retries: attempts per request after the first one fails
+        """
+        super().__init__()
+        self.reddit = reddit
+        self.retries = retries
+        self.started = time.monotonic()
+        self.requests, self.retried, self.waited = 0, 0, 0.0
+        self.remaining, self.reset = None, None
+        # Set once observe() saw the headers, update() then has nothing to do
+        self.observed = False
+        # Set once pace() hooks a session, the requests then count themselves
+        self.paced = False
+        self.local = threading.local()
+
+    def acquire(self, tokens: int = 1) -> float:
+        waited = super().acquire(tokens)
+        self.count(tokens, waited)
+        return waited
+
+    def count(self, tokens: int, waited: float) -> None:
+        """
+        Add a request to the run totals and to the calling thread's total.
+        :param tokens: number of requests made
+        :param waited: seconds spent waiting for them
+        """
+        with self.lock:
+            self.requests += tokens
+            self.waited += waited
+        self.local.requests = self.thread_requests() + tokens
+
+    def thread_requests(self) -> int:
+        """
+        :return: the requests made so far by the calling thread
+        """
+        return getattr(self.local, 'requests', 0)
+
+    def pace(self, session: requests.Session) -> requests.Session:
+        """
+        Take a token for every HTTP request sent through a requests session,
+        and fit the token rate to the headers of every response. Given to
+        praw, this paces and counts each request it makes: the access token,
+        every listing page and every MoreComments replace_more expands,
+        nested ones and praw's own retries included.
+        :param session: the requests Session given to praw
+        :return: the session
+        """
+        send = session.send
+
+        def paced_send(request, **kw):
+            self.acquire()
+            return send(request, **kw)
+
+        session.send = paced_send
+        session.hooks['response'].append(self.observe)
+        self.paced = True
+        return session
+
+    def charge(self, tokens: int = 1) -> None:
+        """
+        Without a paced session, e.g. with a praw.Reddit passed to main(),
+        take the tokens of the requests a call is expected to make up front.
+        :param tokens: number of requests about to be made
+        """
+        if self.paced:
+            return
+        # One token at a time, a burst may be larger than the bucket
+        for _ in range(tokens):
+            self.acquire()
+
+    def call(self, func, *a, tokens: int = 1, **kw):
+        """
+        Make a paced request, retrying transient failures.
+        :param func: the callable making the request
+        :param tokens: number of requests func is expected to make, only
+        charged without a paced session
+        :return: what func returns
+        """
+        attempt = 0
+        while True:
+            self.charge(tokens)
+            try:
+                result = func(*a, **kw)
+            except transient_errors() as e:
+                self.backoff(attempt, e)
+                attempt += 1
+                continue
+            self.update()
+            return result
+
+    def backoff(self, attempt: int, error: Exception) -> None:
+        """
+        Sleep before retrying a failed request, or re-raise the error once
+        the retries are used up.
+        :param attempt: how many retries were already made
+        :param error: the transient exception
+        """
+        if attempt >= self.retries:
+            raise error
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') \
+            if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        rp(f'Warning: {type(error).__name__} from reddit, retrying in '
+           f'{delay:.1f} seconds ({attempt + 1}/{self.retries}).',
+           style=R_COLOR)
+        with self.lock:
+            self.retried += 1
+            self.waited += delay
+        time.sleep(delay)
+
+    def observe(self, response: requests.Response, *a, **kw) -> None:
+        """
+        A response hook of praw's requests session: fit the token rate to the
+        x-ratelimit-remaining and x-ratelimit-reset headers of every response.
+        :param response: a response from reddit
+        """
+        headers = response.headers
+        remaining = headers.get('x-ratelimit-remaining')
+        reset = headers.get('x-ratelimit-reset')
+        if remaining is None or reset is None:
+            return
+        self.fit(float(remaining), time.time() + float(reset))
+        self.observed = True
+
+    def update(self) -> None:
+        """
+        Without the observe hook, e.g. with a praw.Reddit passed to main(),
+        fit the token rate to praw's own view of the quota. Older prawcore
+        versions report the reset time there, prawcore 4 does not.
+        """
+        if self.observed:
+            return
+        auth = getattr(self.reddit, 'auth', None)
+        limits = getattr(auth, 'limits', None) or {}
+        remaining, reset = limits.get('remaining'), limits.get('reset_timestamp')
+        if remaining is None or reset is None:
+            return
+        self.fit(remaining, reset)
+
+    def fit(self, remaining: float, reset: float) -> None:
+        """
+        Fit the token rate to the quota left in the current rate limit window.
+        :param remaining: the requests left in the window
+        :param reset: the UTC epoch time the window resets
+        """
+        with self.lock:
+            self.remaining, self.reset = remaining, reset
+            seconds = max(reset - time.time(), 1.0)
+            self.rate = max(remaining, 0.5) / seconds
+
+    def telemetry(self) -> dict:
+        """
+        :return: requests, requests per second, retries, seconds waited, and
+        the remaining quota and seconds until it resets (None if unknown)
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        resets_in = max(self.reset - time.time(), 0.0) \
+            if self.reset is not None else None
+        return {'requests': self.requests,
+                'requests_per_sec': self.requests / elapsed,
+                'retries': self.retried, 'waited': self.waited,
+                'remaining': self.remaining, 'resets_in': resets_in}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class RedditClients:
+    """
+    The praw.Reddit clients of a run. praw and prawcore keep the access
+    token, their own rate limiter and the requests session in the client
+    without locks, so a thread leases a client of its own for its requests
+    and returns it for the next one; every client is paced by the one
+    RequestScheduler. Returned clients are reused with their access tokens.
+    """
+
+    def __init__(self, factory, *idle):
+        """
+        :param factory: makes a new client when none is idle
+        :param idle: clients made already
+        """
+        self.factory = factory
+        self.idle = list(idle)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def lease(self):
+        """
+        :return: a context manager giving an idle (or new) client
+        """
+        with self.lock:
+            client = self.idle.pop() if self.idle else None
+        if client is None:
+            client = self.factory()
+        try:
+            yield client
+        finally:
+            with self.lock:
+                self.idle.append(client)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def iter_new(r: praw.Reddit, subreddit: str, scheduler: RequestScheduler,
+             limit: int, kind: str = 'new'):
+    """
+    Page through subreddit.new(), or the subreddit's comment stream, one
+    request per 100 items. A page that fails transiently is retried
+    after a backoff, resuming after the last item received instead of
+    starting over.
+    :param r: a praw.Reddit config object with the Reddit API credentials
+    :param subreddit: the subreddit name
+    :param scheduler: the shared RequestScheduler
+    :param limit: maximum number of items
+    :param kind: 'new' for the posts, 'comments' for the comments
+    :return: a generator of praw Submissions (or Comments), newest first
+    """
+    after, count, attempt = None, 0, 0
+    while count < limit:
+        params = {'after': after} if after else None
+        listing = iter(getattr(r.subreddit(subreddit), kind)(
+            limit=limit - count, params=params))
+        first = True
+        while True:
+            # Listings are retrieved 100 posts per request
+            if first or count % 100 == 0:
+                scheduler.charge()
+                first = False
+            try:
+                sub = next(listing)
+            except StopIteration:
+                scheduler.update()
+                return
+            except transient_errors() as e:
+                scheduler.backoff(attempt, e)
+                attempt += 1
+                break
+            attempt = 0
+            after, count = sub.fullname, count + 1
+            yield sub
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def peak_rss() -> float:
+    """
+    :return: the peak resident memory of the process so far in MB, or None
+    where the resource module is unavailable (Windows)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class RunProfiler:
+    """
+    Records the wall time, API requests, bytes received, comments and peak
+    RSS of each stage of each subreddit, and the cost of fetching each
+    submission's comments, for the --profile JSON report. The requests are
+    the ones RequestScheduler.pace() counted as they were sent, so they
+    include the access tokens, every MoreComments expansion and the retries.
+    Also collects the cProfile stats of every thread for --cprofile.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self.started = time.perf_counter()
+        self.stages, self.submissions, self.profiles = [], [], []
+        # bytes are only counted through the session() given to praw
+        self.bytes, self.counting = 0, False
+        self.lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        """
+        :return: a requests Session for praw that counts the bytes received
+        """
+        session = requests.Session()
+        session.hooks['response'].append(self.count_bytes)
+        self.counting = True
+        return session
+
+    def count_bytes(self, response: requests.Response, *a, **kw) -> None:
+        with self.lock:
+            self.bytes += len(response.content)
+
+    def clock(self, subreddit: str) -> 'StageClock':
+        """
+        :param subreddit: the subreddit the stages belong to
+        :return: a StageClock started now
+        """
+        return StageClock(self, subreddit)
+
+    def add_stage(self, record: dict) -> None:
+        with self.lock:
+            self.stages.append(record)
+
+    def add_submission(self, subreddit: str, sub_id: str, seconds: float,
+                       requests_made: int, comments: int) -> None:
+        """
+        Record the cost of fetching and expanding one submission's comments.
+        :param subreddit: the subreddit name
+        :param sub_id: the submission ID
+        :param seconds: wall time of the fetch
+        :param requests_made: HTTP requests the fetch sent
+        :param comments: comments retrieved
+        """
+        with self.lock:
+            self.submissions.append({
+                'subreddit': subreddit, 'id': sub_id, 'seconds': seconds,
+                'requests': requests_made, 'comments': comments,
+                'comments_per_sec': comments / seconds if seconds else None})
+
+    def profiled(self, func, *a, **kw):
+        """
+        Call func under a cProfile of the calling thread if --cprofile is
+        given. From Python 3.12 on, the profile enabled in main() already
+        sees every thread.
+        :return: what func returns
+        """
+        if not args.cprofile or sys.version_info >= (3, 12):
+            return func(*a, **kw)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*a, **kw)
+        finally:
+            profile.disable()
+            with self.lock:
+                self.profiles.append(profile)
+
+    def dump_stats(self, path: str, main_profile: cProfile.Profile) -> None:
+        """
+        Merge the cProfile stats of every thread into one pstats file.
+        :param path: the stats file, readable with pstats or snakeviz
+        :param main_profile: the profile of the main thread
+        """
+        stats = pstats.Stats(main_profile)
+        for profile in self.profiles:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+    def report(self) -> dict:
+        """
+        :return: the run totals, every stage and every submission, the
+        slowest submissions first
+        """
+        usage = self.scheduler.telemetry() if self.scheduler else {}
+        return {'version': __version__,
+                'date': datetime.datetime.utcnow().isoformat(),
+                'seconds': time.perf_counter() - self.started,
+                'requests': usage.get('requests'),
+                'retries': usage.get('retries'),
+                'waited': usage.get('waited'),
+                'bytes': self.bytes if self.counting else None,
+                'peak_rss_mb': peak_rss(),
+                'stages': self.stages,
+                'submissions': sorted(self.submissions,
+                                      key=lambda x: -x['seconds'])}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class StageClock:
+    """
+    Times consecutive stages of one subreddit: each lap records everything
+    since the previous lap. The API requests and bytes are run wide, so they
+    include other subreddits' requests when -b runs several at once.
+    """
+
+    def __init__(self, profiler: RunProfiler, subreddit: str):
+        self.profiler = profiler
+        self.subreddit = subreddit
+        self.mark = self.snapshot()
+
+    def snapshot(self) -> tuple:
+        scheduler = self.profiler.scheduler
+        return (time.perf_counter(),
+                scheduler.requests if scheduler else 0, self.profiler.bytes)
+
+    def lap(self, stage: str, comments: int = None) -> None:
+        """
+        Record the stage that just finished.
+        :param stage: the stage name
+        :param comments: comments processed in the stage, if any
+        """
+        mark = self.snapshot()
+        seconds = mark[0] - self.mark[0]
+        self.profiler.add_stage({
+            'subreddit': self.subreddit, 'stage': stage, 'seconds': seconds,
+            'requests': mark[1] - self.mark[1],
+            'bytes': mark[2] - self.mark[2] if self.profiler.counting
+            else None,
+            'comments': comments,
+            'comments_per_sec': comments / seconds
+            if comments is not None and seconds else None,
+            'peak_rss_mb': peak_rss()})
+        self.mark = mark
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def connection_test(r: praw.Reddit, scheduler: RequestScheduler) -> None:
+    """
+    Retrieve the newest r/announcements post to confirm the connection and
+    credentials work. Run once per invocation, however many subreddits.
+    :param r: a praw.Reddit config object with the Reddit API credentials
+    :param scheduler: the shared RequestScheduler
+    """
+    rp("")
+    console.rule('Connection', style=f'{B_COLOR} bold')
+    rp("")
+    try:
+        rp('Testing connection to reddit.\n')
+        for sub_test in iter_new(r, 'announcements', scheduler, 1):
+            utc_date = datetime.datetime.utcfromtimestamp(sub_test.created_utc)
+            date = utc_date.strftime('%y%m%d')
+            rp(f'Successfully retrieved:', style=G_COLOR)
+            rp(f'\n\tTitle:\t\t[{P_COLOR}]{sub_test.title}[/{P_COLOR}]\n'
+               f'\tTitle Flair:\t[{P_COLOR}]{sub_test.link_flair_text}[/{P_COLOR}]'
+               f'\n\tPermalink:\t[{P_COLOR}]{sub_test.permalink}[/{P_COLOR}]'
+               f'\n\tSubreddit:\t[{P_COLOR}]{sub_test.subreddit}[/{P_COLOR}]'
+               f'\n\tAuthor:\t\t[{P_COLOR}]u/{sub_test.author}[/{P_COLOR}]'
+               f'\n\tAuthor Flair:\t[{P_COLOR}]{sub_test.author_flair_text}'
+               f'[/{P_COLOR}]\n\tDate: \t\t{date}\n')
+    except praw.exceptions.RedditAPIException as e:
+        rp('\nWarning: Reddit API Exception Encountered', style=R_COLOR)
+        rp(e)
+        rp('Exiting application')
+        exit()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def sub_submissions(r: praw.Reddit, subreddit: str,
+                    scheduler: RequestScheduler,
+                    cache: SubCache = None, dump: DumpWriter = None) -> tuple:
+    """
+    This uses praw to query the specified subreddit to return a table of posts
+    with various information. Each row contains: (creation time, title,
+    number of comments, score, ratio, award_count, permalink (aka 'r/'),
+    author, and submission ID (aka 'kopc8z' to reference this post)).
+    The date range is applied while paging: 'new' lists newest first, so
+    posts newer than --to-date are skipped and paging stops at the first post
+    older than --from-date. With a cache, paging also stops at the first
+    settled post inside a span of the listing already paged back to the
+    from date, and the remaining submissions are read from the cache
+    instead; other settled posts are listed but not stored again.
+
+    :param r: a praw.Reddit config object with the Reddit API credentials
+    :param subreddit: the subreddit name
+    :param scheduler: the shared RequestScheduler pacing the API requests
+    :param cache: an optional SubCache of previously retrieved posts
+    :param dump: an optional DumpWriter recording the raw submissions
+    :return: Table of submissions, and True if paging reached the from date
+    """
+    submissions = SubmissionTable()
+    rp("")
+    console.rule('Submissions', style=f'{B_COLOR} bold')
+    rp("")
+    try:
+        rp(f'Attempting to retrieve {args.submissions} submissions from'
+           f' r/{subreddit}\n')
+        start, end = date_window()
+        skipped, reached = 0, False
+        # The span of the listing paged through, recorded in the cache
+        oldest, newest = None, None
+        listing = iter_new(r, subreddit, scheduler, args.submissions)
+        # rich 'track' function creates a progress bar on the cli in for loops
+        for sub in progress(listing, args.submissions):
+            created = int(sub.created_utc)
+            oldest, newest = created, newest or created
+            # Skip posts newer than the to date, stop at the from date
+            if sub.created_utc >= end:
+                skipped += 1
+                continue
+            if sub.created_utc < start:
+                rp(f'Reached the from date {args.from_date}, stopped '
+                   f'retrieving submissions.')
+                reached = True
+                break
+            settled = cache.is_settled(sub.id) if cache else False
+            # Everything older than a settled post in a paged span is cached
+            if settled and cache.covered(subreddit, oldest, start):
+                limit = args.submissions - len(submissions)
+                cached = cache.submissions_from(
+                    subreddit, int(sub.created_utc), start, limit)
+                rp(f'Reached cached submission {sub.id}, loaded {len(cached)}'
+                   f' submissions from {cache.path}')
+                for fields in cached:
+                    if dump:
+                        dump.put_submission(fields)
+                    submissions.append(*fields)
+                # The span went past the from date, unless cut by the limit
+                reached = len(cached) < limit
+                break
+            if cache and not settled:
+                cache.put_submission(subreddit, sub)
+            # Post Title, Number of Comments, Score (Karma), Ratio of Up Votes
+            # to Down Votes, Number of Awards, Permalink and Author
+            fields = (int(sub.created_utc), sub.title, int(sub.num_comments),
+                      int(sub.score), float(sub.upvote_ratio),
+                      int(sub.total_awards_received), sub.permalink,
+                      str(sub.author), sub.id)
+            if dump:
+                dump.put_submission(fields)
+            submissions.append(*fields)
+        if cache and oldest is not None:
+            cache.put_listing(subreddit, oldest, newest)
+        rp(f'\nSuccessfully retrieved {len(submissions)} submissions from'
+           f' r/{subreddit}, skipped {skipped} newer than the to date.',
+           style=G_COLOR)
+    except praw.exceptions.RedditAPIException as e:
+        rp('\nWarning: Reddit API Exception Encountered', style=R_COLOR)
+        rp(e)
+        rp('Please confirm the subreddit name.\nExiting application',
+           style=R_COLOR)
+        exit()
+    except prawcore.exceptions.PrawcoreException as e:
+        rp(f'\nWarning: {type(e).__name__} retrieving submissions after '
+           f'{args.retries} retries', style=R_COLOR)
+        rp(e)
+        rp('Exiting application', style=R_COLOR)
+        exit()
+
+    return submissions, reached
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class CommentStats:
+    """
+    The running comment counters of a run (or of a single submission) fed by
+    streaming (ID, author, score, awards, created_utc) comment tuples, so
+    only the counters are ever held in memory.
+    """
+    __slots__ = ('tot_scores', 'com_awards', 'com_counts', 'com_hours',
+                 'count')
+
+    def __init__(self):
+        self.tot_scores, self.com_awards = dd(int), dd(int)
+        # Comments per UTC epoch hour, the dates are formatted by activity()
+        self.com_counts, self.com_hours = dd(int), dd(int)
+        self.count = 0
+
+    def consume(self, records) -> None:
+        """
+        Count an iterable of comment tuples, consuming it one at a time. The
+        creation times are bucketed by hour as one batch at the end.
+        :param records: (ID, author, score, awards, created_utc) tuples
+        """
+        tot_scores, com_awards = self.tot_scores, self.com_awards
+        com_counts = self.com_counts
+        created = []
+        for _, author, score, awards, created_utc in records:
+            tot_scores[author] += score
+            com_awards[author] += awards
+            com_counts[author] += 1
+            created.append(created_utc)
+        count_hours(created, self.com_hours)
+        self.count += len(created)
+
+    def merge(self, other: 'CommentStats') -> None:
+        """
+        Add the counters of another CommentStats into this one.
+        :param other: e.g. the counts of a single submission
+        """
+        for name in ('tot_scores', 'com_awards', 'com_counts', 'com_hours'):
+            total = getattr(self, name)
+            for key, value in getattr(other, name).items():
+                total[key] += value
+        self.count += other.count
+
+    def add_score(self, author: str, score: int) -> None:
+        """
+        Add a submission score to the author's cumulative upvotes.
+        """
+        self.tot_scores[author] += score
+
+    def total_awards(self) -> int:
+        return sum(self.com_awards.values())
+
+    def unique_commenters(self) -> int:
+        return len(self.com_counts)
+
+    def state(self) -> dict:
+        """
+        :return: the counters as a JSON serializable dict
+        """
+        return {'tot_scores': self.tot_scores, 'com_awards': self.com_awards,
+                'com_counts': self.com_counts, 'com_hours': self.com_hours,
+                'count': self.count}
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'CommentStats':
+        """
+        :param state: a dict saved from state() as JSON
+        :return: the restored CommentStats
+        """
+        stats = cls()
+        stats.tot_scores.update(state['tot_scores'])
+        stats.com_awards.update(state['com_awards'])
+        stats.com_counts.update(state['com_counts'])
+        # JSON object keys are strings
+        stats.com_hours.update((int(hour), count) for hour, count
+                               in state['com_hours'].items())
+        stats.count = state['count']
+        return stats
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters (Metwally et al.) over weighted updates, in a
+    fixed number of counters. An untracked key takes over the smallest
+    counter and inherits its count. With N the sum of the positive weights:
+    every key whose true total exceeds N / capacity is tracked, and every
+    count overestimates its key's true total by at most N / capacity.
+    Negative weights (downvoted comments) only lower keys already tracked.
+    """
+    __slots__ = ('capacity', 'counts', 'heap', 'total')
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: the number of counters
+        """
+        self.capacity = capacity
+        self.counts = {}
+        # (count, key) entries, stale ones are skipped when popped
+        self.heap = []
+        self.total = 0
+
+    def add(self, key, weight: int = 1) -> None:
+        """
+        :param key: e.g. an author
+        :param weight: the amount to add to the key
+        """
+        counts = self.counts
+        if weight > 0:
+            self.total += weight
+        if key in counts:
+            counts[key] += weight
+            if weight < 0:
+                # A lowered count must be visible to the smallest counter
+                heapq.heappush(self.heap, (counts[key], key))
+                if len(self.heap) > 4 * self.capacity:
+                    self.heap = [(c, k) for k, c in counts.items()]
+                    heapq.heapify(self.heap)
+            return
+        if weight <= 0:
+            return
+        if len(counts) < self.capacity:
+            counts[key] = weight
+            heapq.heappush(self.heap, (weight, key))
+            return
+        heap = self.heap
+        while True:
+            count, smallest = heap[0]
+            current = counts.get(smallest)
+            if current == count:
+                break
+            if current is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (current, smallest))
+        del counts[smallest]
+        counts[key] = count + weight
+        heapq.heapreplace(heap, (count + weight, key))
+
+    def items(self):
+        """
+        :return: the tracked (key, estimated count) pairs
+        """
+        return self.counts.items()
+
+    def values(self):
+        return self.counts.values()
+
+    def state(self) -> dict:
+        return {'capacity': self.capacity, 'counts': self.counts,
+                'total': self.total}
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'SpaceSaving':
+        sketch = cls(state['capacity'])
+        sketch.counts = dict(state['counts'])
+        sketch.heap = [(c, k) for k, c in sketch.counts.items()]
+        heapq.heapify(sketch.heap)
+        sketch.total = state['total']
+        return sketch
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class HyperLogLog:
+    """
+    Estimates the number of distinct keys in 2 ** precision one byte
+    registers, with a standard error of 1.04 / sqrt(2 ** precision): 0.81%
+    in 16 KB at the default precision of 14. Keys are hashed with a 64 bit
+    BLAKE2b digest rather than the per process salted hash(), so a sketch
+    saved in a checkpoint keeps counting the same keys after a restart.
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 14):
+        """
+        :param precision: bits of the hash selecting the register
+        """
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        x = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8)
+                           .digest(), 'little')
+        bits = 64 - self.precision
+        # Position of the first 1 bit after the register index bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        index = x >> bits
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        """
+        :return: the estimated number of distinct keys added
+        """
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m \
+            / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small cardinalities are counted more precisely by the empty
+        # registers (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class ApproxCommentStats:
+    """
+    The --approx counterpart of CommentStats for the run totals: the author
+    counters are SpaceSaving sketches of a fixed size and the distinct
+    commenters a HyperLogLog, so memory no longer grows with the number of
+    authors. Comments per hour are few and stay exact. Per submission counts
+    are still exact CommentStats, merged in as each submission completes.
+    """
+    __slots__ = ('tot_scores', 'com_awards', 'com_counts', 'com_hours',
+                 'commenters', 'count')
+
+    def __init__(self, counters: int):
+        """
+        :param counters: counters per author leaderboard
+        """
+        self.tot_scores = SpaceSaving(counters)
+        self.com_awards = SpaceSaving(counters)
+        self.com_counts = SpaceSaving(counters)
+        self.com_hours = dd(int)
+        self.commenters = HyperLogLog()
+        self.count = 0
+
+    def consume(self, records) -> None:
+        """
+        Count an iterable of comment tuples, consuming it one at a time.
+        :param records: (ID, author, score, awards, created_utc) tuples
+        """
+        created = []
+        for _, author, score, awards, created_utc in records:
+            self.tot_scores.add(author, score)
+            self.com_awards.add(author, awards)
+            self.com_counts.add(author)
+            self.commenters.add(author)
+            created.append(created_utc)
+        count_hours(created, self.com_hours)
+        self.count += len(created)
+
+    def merge(self, other: CommentStats) -> None:
+        """
+        Add the exact counters of a CommentStats into the sketches.
+        :param other: e.g. the counts of a single submission
+        """
+        for name in ('tot_scores', 'com_awards', 'com_counts'):
+            sketch = getattr(self, name)
+            for key, value in getattr(other, name).items():
+                sketch.add(key, value)
+        for author in other.com_counts:
+            self.commenters.add(author)
+        for key, value in other.com_hours.items():
+            self.com_hours[key] += value
+        self.count += other.count
+
+    def add_score(self, author: str, score: int) -> None:
+        self.tot_scores.add(author, score)
+
+    def total_awards(self) -> int:
+        return self.com_awards.total
+
+    def unique_commenters(self) -> int:
+        return self.commenters.estimate()
+
+    def state(self) -> dict:
+        """
+        :return: the sketches and counters as a JSON serializable dict
+        """
+        return {'tot_scores': self.tot_scores.state(),
+                'com_awards': self.com_awards.state(),
+                'com_counts': self.com_counts.state(),
+                'com_hours': self.com_hours,
+                'commenters': self.commenters.registers.hex(),
+                'count': self.count}
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'ApproxCommentStats':
+        """
+        :param state: a dict saved from state() as JSON
+        :return: the restored ApproxCommentStats
+        """
+        stats = cls(state['com_counts']['capacity'])
+        for name in ('tot_scores', 'com_awards', 'com_counts'):
+            setattr(stats, name, SpaceSaving.from_state(state[name]))
+        stats.com_hours.update((int(hour), count) for hour, count
+                               in state['com_hours'].items())
+        stats.commenters.registers = bytearray.fromhex(state['commenters'])
+        stats.count = state['count']
+        return stats
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class Checkpoint:
+    """
+    Saves the progress of a comment crawl to a JSON file every --checkpoint
+    seconds, and once more when the crawl fails or is interrupted: the IDs of
+    the submissions counted so far, their counters and their coverage. Each
+    save writes a temporary file and renames it over the previous checkpoint,
+    so the file on disk is always a complete checkpoint.
+    """
+
+    def __init__(self, path: str, run: dict):
+        """
+        :param path: the checkpoint file
+        :param run: the run details a checkpoint must match to be resumed
+        """
+        self.path = path
+        self.run = run
+        self.saved = time.monotonic()
+
+    def load(self):
+        """
+        :return: the (done submission IDs, stats, {day: CommentStats},
+        coverage, --comment-budget expansions spent) of a checkpoint of the
+        same run, or None
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            folder = os.path.dirname(self.path) or '.'
+            prefix = f'checkpoint_{self.run["subreddit"]}_'
+            others = sorted(name for name in os.listdir(folder)
+                            if name.startswith(prefix)
+                            and name.endswith('.json')) \
+                if os.path.isdir(folder) else []
+            rp(f'Warning: No checkpoint {self.path} to resume, starting over.'
+               + (f' Checkpoints of other date ranges: {", ".join(others)}'
+                  if others else ''), style=R_COLOR)
+            return None
+        if state['run'] != self.run:
+            rp(f'Warning: The checkpoint {self.path} is of a different run '
+               f'({state["run"]}), starting over.', style=R_COLOR)
+            return None
+        stats_type = ApproxCommentStats if self.run['approx'] \
+            else CommentStats
+        return (set(state['done']), stats_type.from_state(state['stats']),
+                {int(day): CommentStats.from_state(day_state)
+                 for day, day_state in state['days'].items()},
+                {sub_id: tuple(counted) for sub_id, counted
+                 in state['coverage'].items()}, state.get('spent', 0))
+
+    def save(self, done: set, stats, day_stats: dict, coverage: dict,
+             spent: int = 0, force: bool = False) -> None:
+        """
+        :param done: the IDs of the submissions counted in the stats
+        :param stats: the CommentStats (or ApproxCommentStats) of those posts
+        :param day_stats: with --rollups, their CommentStats by day instead
+        :param coverage: their (comments counted, replace_more limit) by
+        submission ID, see sub_comments
+        :param spent: the --comment-budget expansions those posts spent
+        :param force: save even if the last save is recent
+        """
+        if not force and time.monotonic() - self.saved < args.checkpoint:
+            return
+        state = {'run': self.run, 'version': __version__,
+                 'done': sorted(done), 'stats': stats.state(),
+                 'days': {day: day_state.state()
+                          for day, day_state in day_stats.items()},
+                 'coverage': coverage, 'spent': spent}
+        temp = f'{self.path}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        self.saved = time.monotonic()
+
+    def remove(self) -> None:
+        """
+        Delete the checkpoint once its run is complete.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def checkpoint_path(out: str, subreddit: str) -> str:
+    """
+    Name the checkpoint of a crawl after its subreddit and resolved date
+    range rather than after -out, whose default holds today's date, so
+    --resume finds it on a later day as long as -f and -t are the same.
+    :param out: the -out file of the subreddit
+    :param subreddit: the subreddit name
+    :return: the checkpoint file, in the folder of -out
+    """
+    return os.path.join(os.path.dirname(out), f'checkpoint_{subreddit.lower()}'
+                        f'_{args.from_date:06}-{args.to_date:06}.json')
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def iter_comments(forest):
+    """
+    Walk a comment forest depth first without flattening it into a list.
+    MoreComments left over by replace_more are skipped.
+    :param forest: a praw CommentForest (or any iterable of comments with
+    replies)
+    :return: a generator of comments
+    """
+    more_comments = praw.models.MoreComments
+    stack = [iter(forest)]
+    while stack:
+        com = next(stack[-1], None)
+        if com is None:
+            stack.pop()
+        elif not isinstance(com, more_comments):
+            yield com
+            stack.append(iter(com.replies))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def count_more(forest) -> int:
+    """
+    :param forest: a praw CommentForest
+    :return: the number of MoreComments left to replace in the forest
+    """
+    more_comments = praw.models.MoreComments
+    more, stack = 0, list(forest)
+    while stack:
+        com = stack.pop()
+        if isinstance(com, more_comments):
+            more += 1
+        else:
+            stack.extend(com.replies)
+    return more
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def allocate_budget(num_comments: dict, budget: int) -> dict:
+    """
+    Split a budget of MoreComments expansions across posts by expected
+    yield. The first page of a post brings about TREE_COMMENTS comments and
+    each expansion up to MORE_COMMENTS more, so every expansion goes to the
+    post with the most comments still missing, up to -c per post.
+    :param num_comments: the listed num_comments by submission ID
+    :param budget: the expansions to split
+    :return: the expansions by submission ID, for posts getting any
+    """
+    limits = dd(int)
+    heap = [(TREE_COMMENTS - n, sub_id) for sub_id, n in num_comments.items()
+            if n > TREE_COMMENTS]
+    heapq.heapify(heap)
+    while budget and heap:
+        missing, sub_id = heap[0]
+        limits[sub_id] += 1
+        budget -= 1
+        missing += MORE_COMMENTS
+        if missing < 0 and limits[sub_id] < args.comments:
+            heapq.heapreplace(heap, (missing, sub_id))
+        else:
+            heapq.heappop(heap)
+    return limits
 
 
-__author__ = 'u/Red_BW <https://www.reddit.com/user/Red_BW/>'
-__license__ = 'MIT'
-__origin_date = '2021-01-02'
-__prog__ = 'sub_stats_script'
-__purpose__ = 'A Query Script for Reddit to extract various Data Points'
-__version__ = '0.9.10'
-__version_date__ = '2021-01-05'
-__version_info__ = tuple(int(i) for i in __version__.split('.') if i.isdigit())
-# Initialize the console and rich console print globally
-console = Console()
-rp = console.print
-# Get and format today's date globally
-today_raw = datetime.datetime.today()
-today = today_raw.strftime('%y%m%d')
-ver = f'{__prog__} {__version__} ({__version_date__})'
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class CommentBudget:
+    """
+    The --comment-budget MoreComments expansions of a subreddit, allocated
+    per post with allocate_budget. Posts whose first page turns out to hold
+    every comment give their expansions back, and posts with more
+    MoreComments than expected draw on those spares. The expansions granted
+    to a post are spent once its comments are counted, so a checkpoint
+    resumes with the budget left.
+    """
+
+    def __init__(self, num_comments: dict, budget: int, spent: int = 0):
+        """
+        :param num_comments: the listed num_comments by submission ID
+        :param budget: the expansions to split
+        :param spent: the expansions already spent, by a resumed checkpoint
+        """
+        self.limits = allocate_budget(num_comments, budget)
+        self.spare = budget - sum(self.limits.values())
+        self.spent = spent
+        self.granted = {}
+        self.lock = threading.Lock()
+
+    def take(self, sub_id: str, more: int) -> int:
+        """
+        :param sub_id: the submission ID
+        :param more: the MoreComments in the post's first page
+        :return: the expansions the post may make
+        """
+        with self.lock:
+            limit = self.limits.pop(sub_id, 0)
+            if not more:
+                self.spare += limit
+                return 0
+            extra = min(self.spare, max(0, min(more, args.comments) - limit))
+            self.spare -= extra
+            self.granted[sub_id] = limit + extra
+            return limit + extra
+
+    def settle(self, sub_id: str) -> None:
+        """
+        Count the expansions granted to a post as spent.
+        :param sub_id: the submission ID, whose comments are counted
+        """
+        with self.lock:
+            self.spent += self.granted.pop(sub_id, 0)
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def date_range_loop(post_lists: list) -> list:
+def fetch_comments(r: praw.Reddit, sub_id: str, scheduler: RequestScheduler,
+                   budget: CommentBudget = None) -> tuple:
     """
-    Loop through the Submissions and discard everything not within the date
-    range. Return them as a list.
-    :param post_lists: All posts retrieved
-    :return: Trimmed List of only posts within the requested date range
+    Retrieve and expand the comment tree of a single submission. Safe to run
+    from a worker thread.
+    :param r: a praw.Reddit config object with the Reddit API credentials
+    :param sub_id: the submission ID
+    :param scheduler: the shared RequestScheduler pacing the API requests
+    :param budget: with --comment-budget, the CommentBudget limiting the
+    expansions instead of -c
+    :return: a generator of (ID, author, score, awards, created_utc) tuples,
+    and the replace_more limit used (-c if nothing was left to expand)
     """
-    rp(f'\nAnalyzing dates and attempting to clean the submissions list to the'
-       f' range specified: From: {args.from_date} To: {args.to_date}')
-    # This sorts the list of post lists with oldest date first
-    rp(f'Sorting all posts by date.')
-    post_lists.sort(key=lambda x: x[0])
-    rp(f'Oldest submission date is {post_lists[0][0]}, newest submission date '
-       f'is {post_lists[-1][0]}')
-    # Warn the customer if there are no posts older than the from date
-    if int(post_lists[0][0]) > args.from_date:
-        rp('\nWarning: Not enough posts were retrieved to reach the requested '
-           f'from date: {args.from_date}\n', style=R_COLOR)
-    rp(f'Starting submission post trimming.')
-    date_range_loop_list = []
-    # Iterate through the posts, stripping posts not within the date range
-    for post_list in post_lists:
-        if args.from_date <= int(post_list[0]) <= args.to_date:
-            date_range_loop_list.append(post_list)
-    rp(f'{len(post_lists)} submissions were retrieved. Trimmed down to'
-       f' {len(date_range_loop_list)} submissions.')
-    # Check the number of posts. If trimmed to 0, notify customer and exit
-    if not date_range_loop_list:
-        rp('Attention: The number of posts was trimmed to 0. Please adjust '
-           'the date range or number of submissions to retrieve, to continue. '
-           '\n Exiting Application.', style=R_COLOR)
-        exit()
-    rp(f'Oldest submission date is {date_range_loop_list[0][0]}, newest'
-       f' submission date is {date_range_loop_list[-1][0]}')
-    # This sorts the list of post lists with oldest date first
-    rp('Sorting all submissions by Score')
-    date_range_loop_list.sort(key=lambda x: x[3])
-    return date_range_loop_list
+    # open a reddit connection to the specified submission post
+    submission = r.submission(id=sub_id)
+    forest = scheduler.call(getattr, submission, 'comments')
+    more = count_more(forest)
+    limit = budget.take(sub_id, more) if budget else args.comments
+    # replace_more makes up to limit requests, one per MoreComments it
+    # replaces, nested ones included; a retry resumes with the ones still
+    # left in the forest and only the requests left of the limit
+    made = 0
+
+    def expand():
+        nonlocal made
+        if made >= limit:
+            return
+        before = scheduler.thread_requests()
+        try:
+            forest.replace_more(limit=limit - made)
+        finally:
+            made += scheduler.thread_requests() - before
+
+    if more and limit:
+        scheduler.call(expand, tokens=min(more, limit))
+    records = ((com.id, str(com.author), com.score,
+                com.total_awards_received, int(com.created_utc))
+               for com in iter_comments(forest))
+    return records, limit if more else args.comments
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def sub_submissions(r: praw.Reddit) -> list:
+def submission_comments(clients: RedditClients, sub_id: str,
+                        scheduler: RequestScheduler, keep: bool = False,
+                        budget: CommentBudget = None) -> tuple:
     """
-    This uses praw to query the specified subreddit to return a list of posts
-    with various information. Each list contains: (YYMMDD, title, number of
-    comments, score, ratio, award_count, permalink (aka 'r/'), author,
-    submission ID (aka 'kopc8z' to reference this post), and YYYY-MM-DD).
+    Fetch and count the comments of a single submission, with a client
+    leased for the calling worker.
+    :param clients: the RedditClients of the run
+    :param sub_id: the submission ID
+    :param scheduler: the shared RequestScheduler pacing the API requests
+    :param keep: also return the comment tuples (for the cache or a dump)
+    :param budget: an optional CommentBudget, see fetch_comments
+    :return: the submission ID, its comment tuples (None unless kept), its
+    CommentStats, the seconds and API requests the fetch took, and the
+    replace_more limit used
+    """
+    start, requests_made = time.perf_counter(), scheduler.thread_requests()
+    with clients.lease() as r:
+        records, limit = fetch_comments(r, sub_id, scheduler, budget)
+        if keep:
+            records = list(records)
+        stats = CommentStats()
+        stats.consume(records)
+    cost = (time.perf_counter() - start,
+            scheduler.thread_requests() - requests_made)
+    return sub_id, records if keep else None, stats, cost, limit
 
-    :param r: a praw.Reddit config object with the Reddit API credentials
-    :return: List of submissions
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def sub_comments(clients: RedditClients, subreddit: str,
+                 submissions: SubmissionTable,
+                 scheduler: RequestScheduler, cache: SubCache = None,
+                 dump: DumpWriter = None, replay: dict = None,
+                 settled: set = None, checkpoint: Checkpoint = None) -> tuple:
+    """
+    Use PRAW to grab all comments within the requested subreddit. With
+    --workers above 1 the comment trees are fetched and expanded concurrently,
+    each worker with a client of its own, and the per-submission counts are
+    merged as each one completes. Settled
+    posts found in the cache, and every post when replaying a dump, are
+    counted without any request. With --comment-budget, the expansions are
+    split across the posts to fetch by their num_comments and the busiest
+    posts are fetched first. With --rollups, the posts of days already
+    rolled up are skipped and the stored daily counters merged instead. With
+    a checkpoint, the progress is saved as the posts complete and with
+    --resume the posts of the last checkpoint are not fetched again.
+    :param clients: the RedditClients of the run
+    :param subreddit: the subreddit name
+    :param submissions: the trimmed table of all Submissions
+    :param scheduler: the shared RequestScheduler pacing the API requests
+    :param cache: an optional SubCache of previously retrieved comments
+    :param dump: an optional DumpWriter recording the raw comments
+    :param replay: comment tuples by submission ID loaded with read_dump
+    :param settled: with --rollups, the days whose posts are all retrieved
+    and settled; their rollups are stored in the cache
+    :param checkpoint: an optional Checkpoint of the crawl
+    :return: the CommentStats, whose tot_scores include the submission
+    scores, and the (comments counted, replace_more limit) of every post
+    counted in this run by submission ID, the limit None if not fetched
     """
-    post_list = []
     rp("")
-    console.rule('Submissions', style=f'{B_COLOR} bold')
+    console.rule('Comments', style=f'{B_COLOR} bold')
     rp("")
     try:
-        rp('Testing connection to reddit.\n')
-        for sub_test in r.subreddit('announcements').new(limit=1):
-            utc_date = datetime.datetime.utcfromtimestamp(sub_test.created_utc)
-            date = utc_date.strftime('%y%m%d')
-            rp(f'Successfully retrieved:', style=G_COLOR)
-            rp(f'\n\tTitle:\t\t[{P_COLOR}]{sub_test.title}[/{P_COLOR}]\n'
-               f'\tTitle Flair:\t[{P_COLOR}]{sub_test.link_flair_text}[/{P_COLOR}]'
-               f'\n\tPermalink:\t[{P_COLOR}]{sub_test.permalink}[/{P_COLOR}]'
-               f'\n\tSubreddit:\t[{P_COLOR}]{sub_test.subreddit}[/{P_COLOR}]'
-               f'\n\tAuthor:\t\t[{P_COLOR}]u/{sub_test.author}[/{P_COLOR}]'
-               f'\n\tAuthor Flair:\t[{P_COLOR}]{sub_test.author_flair_text}'
-               f'[/{P_COLOR}]\n\tDate: \t\t{date}\n')
+        rp(f'Attempting to retrieve a maximum of {args.comments} comments each '
+           f'from {len(submissions)} submissions in the r/{subreddit} sub'
+           f' using {args.workers} worker(s).\n')
+        # local counters to build and return
+        stats = ApproxCommentStats(args.approx) if args.approx \
+            else CommentStats()
+        # With rollups the counts are kept per submission day
+        rollups = settled is not None
+        days, day_stats, rolled = {}, dd(CommentStats), set()
+        # The submissions whose comments are counted in stats or day_stats
+        done, coverage, spent = set(), {}, 0
+        if checkpoint and args.resume:
+            resumed = checkpoint.load()
+            if resumed:
+                done, stats, resumed_days, coverage, spent = resumed
+                day_stats.update(resumed_days)
+                rp(f'Resuming from {checkpoint.path}, the comments of '
+                   f'{len(done)} submissions are already counted.')
+        if rollups:
+            days = {sub_id: created_utc // 86400 for sub_id, created_utc
+                    in zip(submissions.id, submissions.created)}
+            rolled = cache.rollup_days(subreddit, args.comments) \
+                & set(days.values())
+            rp(f'Merging the rollups of {len(rolled)} days from {cache.path}.')
+        # Count the settled cached posts, collect the ones to fetch
+        fetch_ids, cached = [], 0
+        for sub_id in submissions.id:
+            if sub_id in done or days.get(sub_id) in rolled:
+                continue
+            if replay is not None:
+                records = replay.get(sub_id, [])
+            elif cache:
+                records = cache.comments(sub_id, args.comments)
+            else:
+                records = None
+            if records is None:
+                fetch_ids.append(sub_id)
+            else:
+                if dump:
+                    dump.put_comments(sub_id, records)
+                (day_stats[days[sub_id]] if rollups else stats).consume(
+                    records)
+                done.add(sub_id)
+                coverage[sub_id] = (len(records), None)
+                cached += 1
+        if cache:
+            rp(f'Loaded the comments of {cached} submissions from '
+               f'{cache.path}, fetching {len(fetch_ids)}.')
+        budget = None
+        if args.comment_budget is not None:
+            num_comments = dict(zip(submissions.id, submissions.num_comments))
+            fetch_ids.sort(key=lambda sub_id: -num_comments[sub_id])
+            # A resumed crawl splits the expansions its checkpoint left
+            left = max(0, args.comment_budget - spent)
+            budget = CommentBudget({sub_id: num_comments[sub_id]
+                                    for sub_id in fetch_ids}, left, spent)
+            rp(f'Splitting a budget of {left} expansions '
+               f'across {len(budget.limits)} of {len(fetch_ids)} submissions, '
+               f'{budget.spare} spare.')
+        keep = bool(cache or dump)
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(profiler.profiled, submission_comments,
+                                   clients, sub_id, scheduler, keep, budget)
+                       for sub_id in fetch_ids]
+            try:
+                # Merge each submission's partial counts as it completes
+                for future in progress(as_completed(futures), len(futures)):
+                    sub_id, records, partial, cost, limit = future.result()
+                    profiler.add_submission(subreddit, sub_id, *cost,
+                                            partial.count)
+                    coverage[sub_id] = (partial.count, limit)
+                    if cache:
+                        cache.put_comments(sub_id, records, limit)
+                    if dump:
+                        dump.put_comments(sub_id, records)
+                    (day_stats[days[sub_id]] if rollups else stats).merge(
+                        partial)
+                    done.add(sub_id)
+                    if budget:
+                        budget.settle(sub_id)
+                    if checkpoint:
+                        checkpoint.save(done, stats, day_stats, coverage,
+                                        budget.spent if budget else 0)
+                    if interrupted.is_set():
+                        raise KeyboardInterrupt
+            except BaseException:
+                # Don't start the remaining posts, keep the counted ones
+                for future in futures:
+                    future.cancel()
+                if checkpoint:
+                    checkpoint.save(done, stats, day_stats, coverage,
+                                    budget.spent if budget else 0, force=True)
+                    rp(f'\nSaved the comments of {len(done)} submissions to '
+                       f'{checkpoint.path}, continue with --resume.',
+                       style=R_COLOR)
+                raise
+        # Store the newly settled days, then merge every day into the total
+        for day, partial in day_stats.items():
+            if day in settled:
+                cache.put_rollup(subreddit, day, partial, args.comments)
+            stats.merge(partial)
+        if rolled:
+            stats.merge(cache.rollup(subreddit, sorted(rolled)))
+        # Fill tot_scores dict with submission scores, after the checkpoints
+        # which only hold comments
+        for author, score in zip(submissions.author, submissions.score):
+            stats.add_score(author, score)
+        rp(f'\nSuccessfully retrieved and iterated through {stats.count} '
+           f'comments.', style=G_COLOR)
     except praw.exceptions.RedditAPIException as e:
         rp('\nWarning: Reddit API Exception Encountered', style=R_COLOR)
         rp(e)
-        rp('Exiting application')
+        rp('Exiting application', style=R_COLOR)
         exit()
-    try:
-        rp(f'Attempting to retrieve {args.submissions} submissions from'
-           f' r/{args.reddit}\n')
-        # rich 'track' function creates a progress bar on the cli in for loops
-        for sub in track(r.subreddit(args.reddit).new(limit=args.submissions),
-                         total=args.submissions):
-            # Date Coding
-            utc_date = datetime.datetime.utcfromtimestamp(sub.created_utc)
-            date = utc_date.strftime('%y%m%d')
-            alt_date = utc_date.strftime('%Y-%m-%d')
-            # Post Title
-            title = sub.title
-            # Number of Comments under this Post
-            num_com = int(sub.num_comments)
-            # The Post Score or Karma
-            score = int(sub.score)
-            # Ratio of Up Votes to Down Votes
-            ratio = float(sub.upvote_ratio)
-            # Count the number of Awards given to the post
-            award_count = int(sub.total_awards_received)
-            # Permalink to the Post
-            permalink = sub.permalink
-            # Post Author
-            author = sub.author
-            sub_list = [date, title, num_com, score, ratio, award_count,
-                        permalink, author, sub, alt_date]
-            post_list.append(sub_list)
-        rp(f'\nSuccessfully retrieved {len(post_list)} submissions from'
-           f' r/{args.reddit}', style=G_COLOR)
-    except praw.exceptions.RedditAPIException as e:
-        rp('\nWarning: Reddit API Exception Encountered', style=R_COLOR)
+    except prawcore.exceptions.PrawcoreException as e:
+        rp(f'\nWarning: {type(e).__name__} retrieving comments after '
+           f'{args.retries} retries', style=R_COLOR)
         rp(e)
-        rp('Please confirm the subreddit name.\nExiting application',
-           style=R_COLOR)
+        rp('Exiting application', style=R_COLOR)
         exit()
 
-    return post_list
+    return stats, coverage
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def sub_comments(r: praw.Reddit, post_lists: list) -> tuple:
+class ReportSection:
     """
-    Use PRAW to grab all comments within the requested subreddit.
-    :param r: a praw.Reddit config object with the Reddit API credentials
-    :param post_lists: the trimmed posts of all Submissions
-    :return: a tuple of 6 lists
+    One ranked list of the report, independent of how it is rendered: the
+    markdown heading and line format, and the console table title and
+    columns. Rows hold the table columns first, then any extra fields the
+    markdown line uses.
+    """
+    __slots__ = ('title', 'heading', 'line', 'columns', 'rows', 'comments')
+
+    def __init__(self, title: str, heading: str, line: str, columns: tuple,
+                 rows: list, comments: bool = True):
+        """
+        :param title: the console table title
+        :param heading: the markdown heading
+        :param line: the markdown line, formatted with the rank and the row
+        :param columns: (header, justify, style, no_wrap) per table column
+        :param rows: the ranked rows
+        :param comments: the section needs -c and is omitted from the
+        markdown without it
+        """
+        self.title = title
+        self.heading = heading
+        self.line = line
+        self.columns = columns
+        self.rows = rows
+        self.comments = comments
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def report_sections(submissions: SubmissionTable, popular_posts: list,
+                    awarded_posts: list, submitters: list, sub_dates: list,
+                    commenters: list, upvotes: list, com_dates: list,
+                    com_hours: list, com_weekdays: list) -> list:
+    """
+    :param submissions: the trimmed SubmissionTable
+    :param popular_posts: row indices of the top posts by score
+    :param awarded_posts: row indices of the top posts by awards
+    :param submitters: the top (author, submissions)
+    :param sub_dates: the top (date, submissions)
+    :param commenters: the top (author, comments)
+    :param upvotes: the top (author, post and comment upvotes)
+    :param com_dates: the top (date, comments)
+    :param com_hours: the top (hour of the day, comments)
+    :param com_weekdays: the top (weekday, comments)
+    :return: the ReportSections in report order
+    """
+    count = ('right', G_COLOR, True)
+    author = (M_COLOR, False)
+    post = submissions
+    return [
+        ReportSection(
+            'Most Popular Posts', '## Most Popular Posts\n\n',
+            '{0}. **{1:,}** upvotes: [{3}]({5}), posted by u/{4}\n',
+            (('Upvotes', 'right', C_COLOR, True),
+             ('Awards', *count), ('Titles', 'left', M_COLOR, False),
+             ('Author', 'right', B_COLOR, True)),
+            [(post.score[i], post.awards[i], post.title[i], post.author[i],
+              post.permalink[i]) for i in popular_posts], comments=False),
+        ReportSection(
+            'Top Awarded Posts', '\n## Top Posts by Awards\n\n',
+            '{0}. **{1}** award(s) for [{2}]({4}), submitted by u/{3}\n',
+            (('Awards', *count), ('Titles', 'left', M_COLOR, False),
+             ('Author', 'right', B_COLOR, True)),
+            [(post.awards[i], post.title[i], post.author[i],
+              post.permalink[i]) for i in awarded_posts], comments=False),
+        ReportSection(
+            'Top Submitters by Author', '\n## Top Submitters\n\n',
+            '{0}. **{1:,}** submissions by u/{2}\n',
+            (('Submissions', *count), ('Author', 'left', *author)),
+            [(n, name) for name, n in submitters], comments=False),
+        ReportSection(
+            'Top Comments by Author', '\n## Top Commenters\n\n',
+            '{0}. **{1:,}** comments by u/{2}\n',
+            (('Comments', *count), ('Author', 'left', *author)),
+            [(n, name) for name, n in commenters]),
+        ReportSection(
+            'Top Upvotes by Author', '\n## Cumulative Upvotes (Post & '
+            'Comments) within this sub by Author\n\n',
+            '{0}. **{1:,}** upvotes to u/{2}\n',
+            (('Upvotes', *count), ('Author', 'left', *author)),
+            [(n, name) for name, n in upvotes]),
+        ReportSection(
+            'Submissions by Date',
+            '\n## Submission Activity - Most Active Days:\n',
+            '{0}. **{1:,}** submissions on **{2}**\n',
+            (('Submissions', *count), ('Date', 'left', *author)),
+            [(n, date) for date, n in sub_dates], comments=False),
+        ReportSection(
+            'Comments by Date', '\n## Comments Activity - Most Active Days:\n',
+            '{0}. **{1:,}** comments on **{2}**\n',
+            (('Comments', *count), ('Date', 'left', *author)),
+            [(n, date) for date, n in com_dates]),
+        ReportSection(
+            'Comments by Hour (UTC)',
+            '\n## Comments Activity - Most Active Hours (UTC):\n',
+            '{0}. **{1:,}** comments at **{2}**\n',
+            (('Comments', *count), ('Hour', 'left', *author)),
+            [(n, hour) for hour, n in com_hours]),
+        ReportSection(
+            'Comments by Weekday',
+            '\n## Comments Activity - Most Active Weekdays:\n',
+            '{0}. **{1:,}** comments on **{2}**\n',
+            (('Comments', *count), ('Weekday', 'left', *author)),
+            [(n, weekday) for weekday, n in com_weekdays])]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def section_table(section: ReportSection):
+    """
+    :param section: a ReportSection
+    :return: the section as a rich Table
+    """
+    table = rich_table.Table(title=section.title)
+    for header, justify, style, no_wrap in section.columns:
+        table.add_column(header, justify=justify, style=style,
+                         no_wrap=no_wrap)
+    width = len(section.columns)
+    for row in section.rows:
+        table.add_row(*(str(value) for value in row[:width]))
+    return table
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def ranked(counts: dict) -> list:
+    """
+    :param counts: a {key: count} dict
+    :return: every (key, count), largest count first, ties by key
+    """
+    return sorted(counts.items(), key=lambda x: (-x[1], x[0]))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def coverage_rows(submissions: SubmissionTable, coverage: dict) -> list:
+    """
+    :param submissions: the trimmed SubmissionTable
+    :param coverage: the (comments, replace_more limit) by submission ID
+    from sub_comments
+    :return: (ID, title, listed num_comments, comments counted, limit,
+    counted / listed) per post, most listed comments first
+    """
+    rows = []
+    for i, sub_id in enumerate(submissions.id):
+        if sub_id not in coverage:
+            continue
+        comments, limit = coverage[sub_id]
+        listed = submissions.num_comments[i]
+        rows.append((sub_id, submissions.title[i], listed, comments, limit,
+                     round(comments / listed, 4) if listed else None))
+    rows.sort(key=lambda row: -row[2])
+    return rows
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def report_tables(submissions: SubmissionTable, totals: dict,
+                  author_awards: dict, sub_counts: dict, sub_activity: tuple,
+                  stats: CommentStats = None, com_activity: tuple = None,
+                  coverage: list = None) -> dict:
+    """
+    The full aggregated tables behind the ranked lists, for the machine
+    readable report formats.
+    :param submissions: the trimmed SubmissionTable
+    :param totals: the report totals
+    :param author_awards: submission and comment awards per author
+    :param sub_counts: submissions per author
+    :param sub_activity: the activity() of the submissions
+    :param stats: the CommentStats, None without -c
+    :param com_activity: the activity() of the comments, None without -c
+    :param coverage: the coverage_rows of the posts, None without -c
+    :return: {table name: (column names, rows)}, rows in rank order except
+    the hour and weekday histograms, in clock and calendar order
+    """
+    score = submissions.score
+    order = sorted(range(len(submissions)), key=lambda i: (-score[i], i))
+    tables = {
+        'totals': (('metric', 'value'), list(totals.items())),
+        'posts': (('id', 'created_utc', 'title', 'author', 'score',
+                   'upvote_ratio', 'num_comments', 'awards', 'permalink'),
+                  [(submissions.id[i], submissions.created[i],
+                    submissions.title[i], submissions.author[i], score[i],
+                    submissions.ratio[i], submissions.num_comments[i],
+                    submissions.awards[i], submissions.permalink[i])
+                   for i in order]),
+        'awards': (('author', 'awards'), ranked(author_awards)),
+        'submitters': (('author', 'submissions'), ranked(sub_counts))}
+    sub_dates, sub_hours, sub_weekdays = sub_activity
+    tables['submission_dates'] = (('date', 'submissions'), ranked(sub_dates))
+    tables['submission_hours'] = (('hour', 'submissions'),
+                                  list(sub_hours.items()))
+    tables['submission_weekdays'] = (('weekday', 'submissions'),
+                                     list(sub_weekdays.items()))
+    if stats is not None:
+        tables['commenters'] = (('author', 'comments'),
+                                ranked(stats.com_counts))
+        tables['upvotes'] = (('author', 'upvotes'), ranked(stats.tot_scores))
+        com_dates, com_hours, com_weekdays = com_activity
+        tables['comment_dates'] = (('date', 'comments'), ranked(com_dates))
+        tables['comment_hours'] = (('hour', 'comments'),
+                                   list(com_hours.items()))
+        tables['comment_weekdays'] = (('weekday', 'comments'),
+                                      list(com_weekdays.items()))
+        tables['coverage'] = (('id', 'title', 'num_comments', 'comments',
+                               'limit', 'coverage'), coverage)
+    return tables
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class Report:
+    """
+    Everything a report backend writes for one subreddit.
+    """
+    __slots__ = ('subreddit', 'totals', 'sections', 'tables')
+
+    def __init__(self, subreddit: str, totals: dict, sections: list,
+                 tables: dict = None):
+        """
+        :param subreddit: the subreddit name
+        :param totals: submissions, comments and awards of the date range
+        :param sections: the ranked ReportSections
+        :param tables: the full tables from report_tables, if needed
+        """
+        self.subreddit = subreddit
+        self.totals = totals
+        self.sections = sections
+        self.tables = tables
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class ReportWriter(abc.ABC):
+    """
+    A report backend selected with --format. It writes a Report to the -out
+    file or next to it, named after it.
+    """
+    # Whether the backend needs the full tables rather than the ranked lists
+    tables = True
+
+    def __init__(self, out: str):
+        """
+        :param out: the -out file of the subreddit
+        """
+        self.out = out
+        self.stem = os.path.splitext(out)[0]
+
+    @abc.abstractmethod
+    def write(self, report: Report) -> list:
+        """
+        :param report: the Report
+        :return: the files written
+        """
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class MarkdownWriter(ReportWriter):
+    """
+    The ranked lists as markdown, ready to paste into a reddit post, written
+    to -out in a single buffered pass.
+    """
+    tables = False
+
+    def write(self, report: Report) -> list:
+        totals = report.totals
+
+        def lines():
+            yield (f'# r/{report.subreddit} Subreddit Stats for '
+                   f'{args.from_date}-{args.to_date}\n\n')
+            # Without -c only reddit's listed comment count is known
+            counted = totals['comments'] is not None
+            yield (f'## Generic Stats:\nTotal Submissions: '
+                   f'**{totals["submissions"]:,}**\n\nTotal Comments: ')
+            yield (f'**{totals["comments"]:,}**\n\n' if counted else
+                   f'**{totals["listed_comments"]:,}** (listed by reddit)\n\n')
+            if counted:
+                approx = ' (estimated)' if args.approx else ''
+                yield (f'Unique Commenters: '
+                       f'**{totals["unique_commenters"]:,}**{approx}\n\n')
+            yield f'Total Awards: **{totals["awards"]}**\n\n'
+            for section in report.sections:
+                if section.comments and not args.comments:
+                    continue
+                yield section.heading
+                for index, row in enumerate(section.rows):
+                    yield section.line.format(index + 1, *row)
+
+        with atomic_path(self.out) as temp, \
+                open(temp, 'w', buffering=2 ** 16) as f:
+            f.writelines(lines())
+        return [self.out]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class JsonWriter(ReportWriter):
+    """
+    Every full table in one JSON file, each as its column names and rows.
+    """
+
+    def write(self, report: Report) -> list:
+        path = f'{self.stem}.json'
+        data = {'subreddit': report.subreddit, 'from_date': args.from_date,
+                'to_date': args.to_date, 'version': __version__,
+                'tables': {name: {'columns': columns, 'rows': rows}
+                           for name, (columns, rows)
+                           in report.tables.items()}}
+        with atomic_path(path) as temp, open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        return [path]
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class CsvWriter(ReportWriter):
+    """
+    One CSV file with a header row per full table.
+    """
+
+    def write(self, report: Report) -> list:
+        paths = []
+        for name, (columns, rows) in report.tables.items():
+            path = f'{self.stem}_{name}.csv'
+            with atomic_path(path) as temp, \
+                    open(temp, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+            paths.append(path)
+        return paths
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class ParquetWriter(ReportWriter):
+    """
+    One Parquet file per full table, written column by column with pyarrow
+    (optional). Every row also gets the subreddit and date range as columns
+    so a folder of runs can be read as one dataset; they are kept in the
+    file metadata as well.
+    """
+
+    def write(self, report: Report) -> list:
+        metadata = {'subreddit': report.subreddit,
+                    'from_date': str(args.from_date),
+                    'to_date': str(args.to_date)}
+        paths = []
+        for name, (columns, rows) in report.tables.items():
+            path = f'{self.stem}_{name}.parquet'
+            values = list(zip(*rows)) or [()] * len(columns)
+            data = {column: list(value) for column, value
+                    in zip(columns, values)}
+            data.update({'subreddit': [report.subreddit] * len(rows),
+                         'from_date': [args.from_date] * len(rows),
+                         'to_date': [args.to_date] * len(rows)})
+            table = pyarrow.table(data, metadata=metadata)
+            with atomic_path(path) as temp:
+                pyarrow_parquet.write_table(table, temp)
+            paths.append(path)
+        return paths
+
+
+REPORT_WRITERS = {'markdown': MarkdownWriter, 'json': JsonWriter,
+                  'csv': CsvWriter, 'parquet': ParquetWriter}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def sub_pipeline(clients: RedditClients, subreddit: str,
+                 scheduler: RequestScheduler,
+                 replay: tuple = None, watch: SubWatch = None) -> dict:
+    """
+    Retrieve, trim, aggregate and output the stats of a single subreddit.
+    Several pipelines may run at once, sharing the scheduler; each leases
+    its own clients.
+    :param clients: the RedditClients of the run (giving None when replaying)
+    :param subreddit: the subreddit name
+    :param scheduler: the shared RequestScheduler pacing the API requests
+    :param replay: the (posts, comments) loaded with read_dump, if replaying
+    :param watch: with --watch, the SubWatch keeping the aggregates for the
+    following ticks
+    :return: the summary totals of the subreddit
+    """
+    out = sub_path(args.out, subreddit)
+    clock = profiler.clock(subreddit)
+    # Open the local submission and comment cache if requested
+    cache, dump = None, None
+    if args.cache and not args.from_dump:
+        cache = SubCache(args.cache, args.refresh_hours)
+        rp(f'Using the submission and comment cache {args.cache}',
+           style=G_COLOR)
+    if args.dump:
+        dump = DumpWriter(sub_path(args.dump, subreddit), subreddit)
+        rp(f'Recording the retrieved data to {dump.path}', style=G_COLOR)
+    # retrieve a table of submissions
+    submissions, reached = SubmissionTable(), False
+    replay_posts, replay_comments = replay or (None, None)
+    if args.from_dump:
+        rp(f'Replaying {len(replay_posts)} submissions from {args.from_dump}',
+           style=G_COLOR)
+        for fields in replay_posts[:args.submissions]:
+            if dump:
+                dump.put_submission(fields)
+            submissions.append(*fields)
+    elif args.submissions:
+        with clients.lease() as reddit:
+            submissions, reached = sub_submissions(reddit, subreddit,
+                                                   scheduler, cache, dump)
+    clock.lap('submissions')
+    # Trim the submissions to the date range specified
+    submissions = date_range_loop(submissions, reached)
+    clock.lap('trim')
+    checkpoint, stats, coverage = None, None, None
+    # Retrieve comments if requested
+    if args.comments:
+        rp('Attempting reddit connection for comments.')
+        # Rollups skip posts, so they are not used while recording a dump
+        settled = settled_days(submissions, reached) \
+            if args.rollups and cache and not dump else None
+        # A checkpoint only resumes a run counting the same comments
+        if args.checkpoint is not None:
+            checkpoint = Checkpoint(
+                checkpoint_path(out, subreddit),
+                {'subreddit': subreddit.lower(), 'from_date': args.from_date,
+                 'to_date': args.to_date, 'comments': args.comments,
+                 'approx': args.approx, 'rollups': settled is not None,
+                 'comment_budget': args.comment_budget})
+        stats, coverage = sub_comments(clients, subreddit, submissions,
+                                       scheduler, cache, dump,
+                                       replay_comments, settled, checkpoint)
+        clock.lap('comments', stats.count)
+
+    if cache:
+        cache.close()
+    if dump:
+        dump.close()
+    summary = sub_report(subreddit, out, submissions, clock, stats,
+                         coverage)
+    # The crawl is in the reports now, a later --resume starts over
+    if checkpoint:
+        checkpoint.remove()
+    if watch:
+        with clients.lease() as reddit:
+            watch.start(reddit, scheduler, submissions, stats, coverage)
+    return summary
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def sub_report(subreddit: str, out: str, submissions: SubmissionTable,
+               clock: StageClock, stats=None, coverage: dict = None) -> dict:
     """
+    Rank, output and print the stats of a single subreddit.
+    :param subreddit: the subreddit name
+    :param out: the -out file of the subreddit
+    :param submissions: the trimmed SubmissionTable, oldest first
+    :param clock: the StageClock of the run
+    :param stats: with -c, the CommentStats (or ApproxCommentStats) whose
+    tot_scores include the submission scores
+    :param coverage: with -c, the (comments counted, replace_more limit) of
+    the posts counted by submission ID, see sub_comments
+    :return: the summary totals of the subreddit
+    """
+    # The comment totals are None, n/a in the report, unless counted
+    total_comments, com_awards, unique_commenters = None, None, None
+    comment_coverage, com_activity = None, None
+    # The post level stats come straight from the listing, without a request
+    # per post; -c adds the comment stats on top
+    awd_sub_dict = submissions.group_sum('awards')
+    sub_awards = sum(submissions.awards)
+    total_awards = sub_awards
+    sub_counts = Counter(submissions.author)
+    sub_hours = dd(int)
+    count_hours(submissions.created, sub_hours)
+    sub_activity = activity(sub_hours)
+    # reddit's own comment counts, including removed and unexpanded ones
+    listed_comments = sum(submissions.num_comments)
+    if stats is not None:
+        # The share of the listed comments counted, over the posts counted
+        # in this run
+        coverage = coverage_rows(submissions, coverage)
+        listed = sum(row[2] for row in coverage)
+        if listed:
+            comment_coverage = round(sum(row[3] for row in coverage) / listed,
+                                     4)
+        # Format the hourly counts into dates, hours of the day and weekdays
+        com_activity = activity(stats.com_hours)
+        com_dates, com_hours, com_weekdays = com_activity
+        # Rank only the maximum requested of each list
+        rp(f'Ranking the top {args.max_top} of each list.')
+        t_com_counts_l = top_k(stats.com_counts.items(), args.max_top)
+        t_com_dates_l = top_k(com_dates.items(), args.max_top)
+        t_com_hours_l = top_k([(hour, n) for hour, n in com_hours.items()
+                               if n], args.max_top)
+        t_com_weekdays_l = top_k([(weekday, n) for weekday, n
+                                  in com_weekdays.items() if n], args.max_top)
+        t_tot_scores_l = top_k(stats.tot_scores.items(), args.max_top)
+        # Get Total Comments
+        total_comments = stats.count
+        unique_commenters = stats.unique_commenters()
+        # Get Comment Awards
+        for author, awards in stats.com_awards.items():
+            awd_sub_dict[author] += awards
+        com_awards = stats.total_awards()
+        total_awards += com_awards
+
+    # Rank the posts by score, and by awards then score; ties go to the
+    # oldest post
+    score, awards = submissions.score, submissions.awards
+    t_popular_posts = top_k(range(len(submissions)), args.max_top,
+                            key=lambda i: (-score[i], i))
+    total_submissions = len(submissions)
+    t_awd_post_l = top_k(range(len(submissions)), args.max_top,
+                         key=lambda i: (-awards[i], -score[i], i))
+    t_sub_counts_l = top_k(sub_counts.items(), args.max_top)
+    t_sub_dates_l = top_k(sub_activity[0].items(), args.max_top)
+    clock.lap('ranking')
+
+    # Output the data
     rp("")
-    console.rule('Comments', style=f'{B_COLOR} bold')
+    console.rule('Output File', style=f'{B_COLOR} bold')
     rp("")
-    try:
-        rp(f'Attempting to retrieve a maximum of {args.comments} comments each '
-           f'from {len(post_lists)} submissions in the r/{args.reddit} sub.\n')
-        # local default dicts to build and return
-        com_awards, com_counts, com_dates = dd(int), dd(int), dd(int)
-        sub_counts, sub_dates, tot_scores = dd(int), dd(int), dd(int)
-        # Count the number of comments iterating through
-        count = 0
-        # Iterate through each post
-        for post_list in track(post_lists, total=len(post_lists)):
-            # Fill tot_scores dict with submission scores
-            tot_scores[str(post_list[7])] += post_list[3]
-            # Fill sub_dates dict with submission dates
-            sub_dates[post_list[9]] += 1
-            # Fill sub_count dict with count of author posts
-            sub_counts[str(post_list[7])] += 1
-            # open a reddit connection to the specified submission post
-            submission = r.submission(id=post_list[8])
-            submission.comments.replace_more(limit=args.comments)
-            # Iterate through the comments list
-            for com in submission.comments.list():
-                tot_scores[str(com.author)] += com.score
-                com_awards[str(com.author)] += com.total_awards_received
-                com_counts[str(com.author)] += 1
-                utc_date = datetime.datetime.utcfromtimestamp(com.created_utc)
-                date = utc_date.strftime('%Y-%m-%d')
-                com_dates[date] += 1
-                count += 1
-        rp(f'\nSuccessfully retrieved and iterated through {count} comments.',
-           style=G_COLOR)
-    except praw.exceptions.RedditAPIException as e:
-        rp('\nWarning: Reddit API Exception Encountered', style=R_COLOR)
-        rp(e)
-        rp('Exiting application', style=R_COLOR)
-        exit()
+    com_lists = (t_com_counts_l, t_tot_scores_l, t_com_dates_l,
+                 t_com_hours_l, t_com_weekdays_l) if stats is not None \
+        else ((),) * 5
+    sections = report_sections(submissions, t_popular_posts, t_awd_post_l,
+                               t_sub_counts_l, t_sub_dates_l, *com_lists)
+    totals = {'submissions': total_submissions, 'comments': total_comments,
+              'listed_comments': listed_comments,
+              'comment_coverage': comment_coverage,
+              'unique_commenters': unique_commenters,
+              'awards': total_awards, 'submission_awards': sub_awards,
+              'comment_awards': com_awards}
+    writers = [REPORT_WRITERS[fmt](out) for fmt in args.format]
+    tables = None
+    if any(writer.tables for writer in writers):
+        tables = report_tables(submissions, totals, awd_sub_dict, sub_counts,
+                               sub_activity, stats, com_activity, coverage)
+    report = Report(subreddit, totals, sections, tables)
+    # TODO: add a check if file exists
+    rp(f'Attempting to output the {", ".join(args.format)} report to '
+       f'{out}.')
+    for writer in writers:
+        for path in writer.write(report):
+            rp(f'Wrote {path}')
+    rp('\nSuccessfully completed writing to file.\n', style=G_COLOR)
+    clock.lap('markdown')
+    if not args.quiet:
+        rp('Printing Tables')
+    rp("")
+    console.rule('Output Tables', style=f'{B_COLOR} bold')
+    rp("")
+    approx = ' (estimated)' if args.approx else ''
+
+    def shown(value, spec: str = ',', suffix: str = '') -> str:
+        return 'n/a' if value is None else f'{value:{spec}}{suffix}'
+
+    rp(f'\tTotal Submissions:\t{total_submissions:,}'
+       f'\n\tTotal Comments:\t\t{shown(total_comments)}\n\tListed Comments:'
+       f'\t{listed_comments:,}\n\tComment Coverage:\t'
+       f'{shown(comment_coverage, ".1%")}\n\tUnique Commenters:\t'
+       f'{shown(unique_commenters, ",", approx)}\n\tTotal Awards:\t\t'
+       f'{total_awards}\n\tSubmission Awards:\t{sub_awards}\n\t'
+       f'Comment Awards:\t\t{shown(com_awards, "")}\n')
+    # Headless runs skip building and rendering the tables altogether
+    if not args.quiet:
+        for section in sections:
+            if section.comments and not args.comments:
+                continue
+            rp(section_table(section))
+        # How much of the busiest threads the budget covered
+        if args.comment_budget is not None:
+            rp(section_table(ReportSection(
+                'Comment Coverage by Post', '', '',
+                (('Listed', 'right', C_COLOR, True),
+                 ('Counted', 'right', G_COLOR, True),
+                 ('Coverage', 'right', G_COLOR, True),
+                 ('Limit', 'right', B_COLOR, True),
+                 ('Titles', 'left', M_COLOR, False)),
+                [(listed, comments, 'n/a' if share is None
+                  else f'{share:.0%}', '' if limit is None else limit, title)
+                 for _, title, listed, comments, limit, share
+                 in coverage[:args.max_top]])))
+        rp('Tables Complete.', style=G_COLOR)
+    clock.lap('tables')
+    top_post = submissions.permalink[t_popular_posts[0]] \
+        if t_popular_posts else ''
+    return {'subreddit': subreddit, 'submissions': total_submissions,
+            'comments': total_comments, 'listed_comments': listed_comments,
+            'awards': total_awards, 'top_post': top_post, 'out': out}
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+class SubWatch:
+    """
+    The aggregates of a subreddit kept warm between the ticks of --watch.
+    Each tick pages the subreddit's comment stream back to the newest
+    comment seen by the last one and counts the new comments into the same
+    counters, then lists the posts again for their current scores, which
+    costs a request per 100 posts instead of one or more per post.
+    """
+
+    def __init__(self, subreddit: str):
+        """
+        :param subreddit: the subreddit name
+        """
+        self.subreddit = subreddit
+        self.out = sub_path(args.out, subreddit)
+        self.submissions, self.stats, self.coverage = None, None, None
+        # The (author, score) of every post, folded into stats.tot_scores
+        self.scores = {}
+        # The newest comment IDs of the stream, newest first
+        self.seen = deque(maxlen=SEEN_COMMENTS)
+        self.marked = False
+
+    def start(self, r: praw.Reddit, scheduler: RequestScheduler,
+              submissions: SubmissionTable, stats=None,
+              coverage: dict = None) -> None:
+        """
+        Keep the aggregates of the first pass of sub_pipeline. With -c the
+        comment stream is marked, the comments made from here on are counted
+        by the ticks.
+        :param r: a praw.Reddit config object with the Reddit API credentials
+        :param scheduler: the shared RequestScheduler pacing the API requests
+        :param submissions: the trimmed SubmissionTable
+        :param stats: with -c, the CommentStats including the post scores
+        :param coverage: with -c, the coverage by submission ID
+        """
+        self.submissions, self.stats, self.coverage = \
+            submissions, stats, coverage
+        self.scores = dict(zip(submissions.id,
+                               zip(submissions.author, submissions.score)))
+        if stats is not None:
+            self.poll(r, scheduler)
+
+    def poll(self, r: praw.Reddit, scheduler: RequestScheduler) -> list:
+        """
+        Page the comment stream, newest first, until a comment already seen.
+        The first poll only marks where the stream stands.
+        :param r: a praw.Reddit config object with the Reddit API credentials
+        :param scheduler: the shared RequestScheduler pacing the API requests
+        :return: the (submission ID, comment tuple) of the new comments
+        """
+        seen, fresh, ids = set(self.seen), [], []
+        limit = 1000 if self.marked else 100
+        try:
+            for com in iter_new(r, self.subreddit, scheduler, limit,
+                                'comments'):
+                if com.id in seen:
+                    break
+                ids.append(com.id)
+                fresh.append((com.link_id.split('_', 1)[-1],
+                              (com.id, str(com.author), com.score,
+                               com.total_awards_received,
+                               int(com.created_utc))))
+            else:
+                if self.marked and len(ids) >= limit:
+                    rp(f'Warning: More than {limit} comments were made in '
+                       f'r/{self.subreddit} since the last tick, the older '
+                       f'ones were missed. Lower --watch to keep up.',
+                       style=R_COLOR)
+        except prawcore.exceptions.PrawcoreException as e:
+            rp(f'\nWarning: {type(e).__name__} retrieving the new comments '
+               f'after {args.retries} retries', style=R_COLOR)
+            rp(e)
+            # Nothing is counted yet, the next tick marks the stream instead
+            if not self.marked:
+                return []
+            exit()
+        self.seen.extendleft(reversed(ids))
+        if not self.marked:
+            self.marked = True
+            return []
+        return fresh
+
+    def tick(self, clients: RedditClients,
+             scheduler: RequestScheduler) -> dict:
+        """
+        Count the new comments, refresh the posts and rewrite the reports.
+        Nothing is updated until both listings are retrieved, a failed tick
+        leaves the aggregates (and the reports) of the last one. A subreddit
+        whose first pass failed runs it again instead.
+        :param clients: the RedditClients of the run
+        :param scheduler: the shared RequestScheduler pacing the API requests
+        :return: the summary totals of the subreddit
+        """
+        if self.submissions is None:
+            return sub_pipeline(clients, self.subreddit, scheduler,
+                                watch=self)
+        clock = profiler.clock(self.subreddit)
+        with clients.lease() as r:
+            # The comments first: every post they were made on is listed next
+            fresh = self.poll(r, scheduler) if self.stats is not None else []
+            clock.lap('comments', len(fresh))
+            submissions, reached = sub_submissions(r, self.subreddit,
+                                                   scheduler)
+        submissions = date_range_loop(submissions, reached)
+        clock.lap('submissions')
+        if self.stats is not None:
+            window, records = set(submissions.id), []
+            for sub_id, record in fresh:
+                if sub_id not in window:
+                    continue
+                records.append(record)
+                # Posts rolled up by the first pass have no coverage
+                if sub_id in self.coverage or sub_id not in self.scores:
+                    count, limit = self.coverage.get(sub_id, (0, None))
+                    self.coverage[sub_id] = (count + 1, limit)
+            self.stats.consume(records)
+            rp(f'Counted {len(records)} new comments, {self.stats.count:,} '
+               f'in total.')
+            # Move the post scores in tot_scores to their current values
+            scores = dict(zip(submissions.id,
+                              zip(submissions.author, submissions.score)))
+            for sub_id, (author, score) in scores.items():
+                old = self.scores.pop(sub_id, None)
+                if old != (author, score):
+                    if old:
+                        self.stats.add_score(old[0], -old[1])
+                    self.stats.add_score(author, score)
+            for author, score in self.scores.values():
+                self.stats.add_score(author, -score)
+            self.scores = scores
+        self.submissions = submissions
+        return sub_report(self.subreddit, self.out, submissions, clock,
+                          self.stats, self.coverage)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def write_summary(path: str, summaries: list) -> None:
+    """
+    Write the combined markdown summary of a batch run.
+    :param path: the summary file
+    :param summaries: the sub_pipeline summaries (None for failed subreddits)
+    """
+    lines = [f'# Subreddit Stats for {args.from_date}-{args.to_date}\n\n',
+             '| Subreddit | Submissions | Comments | Awards | Most Popular Post '
+             '| Report |\n', '|:-|-:|-:|-:|:-|:-|\n']
+    for name, summary in summaries:
+        if summary is None:
+            lines.append(f'| r/{name} | | | | failed | |\n')
+            continue
+        comments = f"{summary['comments']:,}" \
+            if summary['comments'] is not None \
+            else f"{summary['listed_comments']:,} (listed)"
+        lines.append(f"| r/{name} | {summary['submissions']:,} | "
+                     f"{comments} | {summary['awards']:,} | "
+                     f"{summary['top_post']} | {summary['out']} |\n")
+    with atomic_path(path) as temp, open(temp, 'w') as f:
+        f.write(''.join(lines))
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def run_batch(tasks: dict, scheduler: RequestScheduler) -> list:
+    """
+    Run a pipeline per subreddit, up to --batch-workers at once, then write
+    the combined summary of a batch and print the API usage.
+    :param tasks: the (function, *arguments) returning the summary totals,
+    by subreddit name
+    :param scheduler: the shared RequestScheduler
+    :return: the (subreddit, summary) of each subreddit, None if it failed
+    """
+    summaries = []
+    with ThreadPoolExecutor(max_workers=args.batch_workers) as pool:
+        futures = {pool.submit(profiler.profiled, *task): name
+                   for name, task in tasks.items()}
+        try:
+            for future in as_completed(futures):
+                try:
+                    summaries.append((futures[future], future.result()))
+                except SystemExit:
+                    rp(f'Warning: r/{futures[future]} stopped early.',
+                       style=R_COLOR)
+                    summaries.append((futures[future], None))
+                except Exception as e:
+                    # An unexpected error fails its subreddit, not the batch
+                    rp(f'Warning: r/{futures[future]} failed with '
+                       f'{type(e).__name__}: {e}', style=R_COLOR)
+                    summaries.append((futures[future], None))
+        except KeyboardInterrupt:
+            # The running pipelines stop after their current submission and
+            # save their checkpoints before the pool shuts down
+            interrupted.set()
+            for future in futures:
+                future.cancel()
+            raise
+    if len(args.reddit) > 1:
+        summaries.sort(key=lambda x: args.reddit.index(x[0]))
+        write_summary(args.summary, summaries)
+        rp(f'Wrote the combined summary to {args.summary}', style=G_COLOR)
+    if not args.from_dump:
+        usage = scheduler.telemetry()
+        quota = 'unknown' if usage['remaining'] is None else \
+            f'{usage["remaining"]:,.0f} (resets in {usage["resets_in"]:.0f}s)'
+        rp(f'\tAPI Requests:\t\t{usage["requests"]:,} '
+           f'({usage["requests_per_sec"]:.2f}/s)\n\tRetries:\t\t'
+           f'{usage["retries"]}\n\tRate Limit Waits:\t{usage["waited"]:.1f}s'
+           f'\n\tRemaining Quota:\t{quota}\n')
+    return summaries
+
 
-    # Convert the dictionaries to list
-    rp('\nConverting the comment dictionaries to lists.')
-    com_awards_l = [(key, value) for key, value in com_awards.items()]
-    com_counts_l = [(key, value) for key, value in com_counts.items()]
-    com_dates_l = [(key, value) for key, value in com_dates.items()]
-    sub_counts_l = [(key, value) for key, value in sub_counts.items()]
-    sub_dates_l = [(key, value) for key, value in sub_dates.items()]
-    tot_scores_l = [(key, value) for key, value in tot_scores.items()]
-    # Sort the Lists
-    rp('Sorting the comment lists.')
-    com_awards_l.sort(key=lambda x: x[1], reverse=True)
-    com_counts_l.sort(key=lambda x: x[1], reverse=True)
-    com_dates_l.sort(key=lambda x: x[1], reverse=True)
-    sub_counts_l.sort(key=lambda x: x[1], reverse=True)
-    sub_dates_l.sort(key=lambda x: x[1], reverse=True)
-    tot_scores_l.sort(key=lambda x: x[1], reverse=True)
-    return com_counts_l, com_dates_l, sub_counts_l, sub_dates_l, tot_scores_l,\
-        com_awards_l
-
-
-# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-def main():
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+def main(reddit: praw.Reddit = None):
+    """
+    Run the whole pipeline for every requested subreddit: connect once, then
+    retrieve, trim, aggregate and output the stats of each subreddit, up to
+    --batch-workers of them at once, under one shared API rate budget.
+    :param reddit: an optional praw.Reddit (or stand-in) to use instead of
+    the read_only site in ./praw.ini
+    """
 
     rp("")
     console.rule('Initialization', style=f'{B_COLOR} bold')
     rp("")
     # Reddit API Limit warning and Trim
+    if args.submissions == 'auto':
+        rp('Retrieving as many submissions as the date range requires, up to '
+           'the Reddit API limit of 1000.')
+        args.submissions = 1000
     if args.submissions > 1000:
         rp(f'Warning: The Reddit API is limited to 1000 requests on an object.'
            f' Requested maximum of {args.submissions} submissions (-sub-lim, '
            f'--sub-limit) will be trimmed to 1000.')
         args.submissions = 1000
+    if args.workers < 1:
+        rp(f'Warning: At least 1 worker is required. Requested {args.workers}'
+           f' workers (-w, --workers) will be raised to 1.')
+        args.workers = 1
+    if args.batch_workers < 1:
+        rp(f'Warning: At least 1 batch worker is required. Requested '
+           f'{args.batch_workers} batch workers (-b, --batch-workers) will be '
+           f'raised to 1.')
+        args.batch_workers = 1
+    if args.retries < 0:
+        rp(f'Warning: Requested {args.retries} retries (--retries) will be '
+           f'raised to 0.')
+        args.retries = 0
     if args.comments > 1000:
         rp(f'Warning: The Reddit API is limited to 1000 requests on an object.'
            f' Requested maximum of {args.comments} comments (-com-lim, --'
            f'com-limit) retrieved per post will be trimmed to 1000 per post.')
         args.comments = 1000
+    if args.comment_budget is not None and not args.comments:
+        args.comments = 1000
+    if args.comment_budget is not None and args.comment_budget < 0:
+        rp(f'Warning: Requested budget of {args.comment_budget} expansions '
+           f'(--comment-budget) will be raised to 0.')
+        args.comment_budget = 0
+    if args.comment_budget is not None and args.rollups:
+        rp('Warning: Rollups need every post expanded to -c, --rollups is '
+           'ignored with --comment-budget.', style=R_COLOR)
+        args.rollups = False
+    if args.approx and args.rollups:
+        rp('Warning: Rollups store exact counts, --rollups is ignored with '
+           '--approx.', style=R_COLOR)
+        args.rollups = False
+    if args.approx is not None and args.approx < args.max_top:
+        rp(f'Warning: --approx needs at least as many counters as --max-top, '
+           f'raised to {args.max_top}.')
+        args.approx = args.max_top
+    if args.rollups and not args.cache:
+        args.cache = CACHE_FILE
+    if args.resume and args.dump:
+        rp('Warning: A dump records every comment, --resume is ignored with '
+           '--dump.', style=R_COLOR)
+        args.resume = False
+    if args.resume and args.checkpoint is None:
+        args.checkpoint = CHECKPOINT_SECONDS
+    if args.checkpoint is not None and args.checkpoint < 0:
+        rp(f'Warning: Requested checkpoints every {args.checkpoint} seconds '
+           f'(--checkpoint) will be raised to 0, after every submission.')
+        args.checkpoint = 0
+    if args.watch is not None and args.from_dump:
+        rp('Warning: A dump has no new posts or comments, --watch is ignored '
+           'with --from-dump.', style=R_COLOR)
+        args.watch = None
+    if args.watch is not None and args.watch < 0:
+        rp(f'Warning: Requested refreshes every {args.watch} seconds '
+           f'(--watch) will be raised to 0.')
+        args.watch = 0
+    # Parquet is optional, fall back to the other formats without pyarrow
+    args.format = list(dict.fromkeys(args.format))
+    if 'parquet' in args.format:
+        try:
+            pyarrow_parquet.write_table
+        except ImportError:
+            rp('Warning: The parquet format needs pyarrow (pip install '
+               'pyarrow), it will be skipped.', style=R_COLOR)
+            args.format.remove('parquet')
+            args.format = args.format or ['markdown']
+
+    # Collect the subreddits from -r and --reddit-file
+    args.reddit = list(args.reddit or [])
+    if args.reddit_file:
+        args.reddit += read_subreddits(args.reddit_file)
+    # Load a recorded run first as it supplies the subreddit, comment limit
+    # and date range
+    replay = None
+    if args.from_dump:
+        info, replay_posts, replay_comments = read_dump(args.from_dump)
+        replay = (replay_posts, replay_comments)
+        args.reddit = args.reddit or [info['subreddit']]
+        args.comments = args.comments or info['comments']
+        if args.from_date is None:
+            args.from_date = info.get('from_date')
+        if args.to_date is None:
+            args.to_date = info.get('to_date')
+    if args.from_date is None:
+        args.from_date = int(today)
+    if args.to_date is None:
+        args.to_date = int(today)
+    if args.watch is not None and args.to_date < int(today):
+        rp(f'Warning: The to date {args.to_date} has passed, --watch only '
+           f'adds the new comments on its posts.', style=R_COLOR)
+    if not args.reddit:
+        rp('Attention: No subreddit was specified (-r, --reddit-file).\n'
+           'Exiting Application.', style=R_COLOR)
+        exit()
 
     if not args.out:
-        args.out = f'./output/reddit_{args.reddit}_{today}.txt'
+        args.out = f'./output/reddit_{{subreddit}}_{today}.txt'
+    if not args.summary:
+        args.summary = f'./output/reddit_batch_{today}.txt'
 
     # Print the Program Name, Version, and Purpose
     rp(f'{ver}: {__purpose__}\n', style=O_COLOR)
     rp(f'Outputting to Rich Console: {console}\n')
     # Print the runtime arguments/variables used
     rp(f'Using this configuration:'
-       f'\n\tSubreddit:\t\t[{P_COLOR}]r/{args.reddit}[/{P_COLOR}]'
+       f'\n\tSubreddit:\t\t[{P_COLOR}]'
+       f'{", ".join("r/" + name for name in args.reddit)}[/{P_COLOR}]'
+       f'\n\tBatch Workers:\t\t[{P_COLOR}]{args.batch_workers}[/{P_COLOR}]'
        f'\n\tNum of Submissions:\t[{P_COLOR}]{args.submissions}[/{P_COLOR}]'
        f'\n\tNum of Comments:\t[{P_COLOR}]{args.comments}[/{P_COLOR}]'
+       f'\n\tComment Budget:\t\t[{P_COLOR}]{args.comment_budget}'
+       f'[/{P_COLOR}]'
+       f'\n\tComment Workers:\t[{P_COLOR}]{args.workers}[/{P_COLOR}]'
+       f'\n\tApprox Counters:\t[{P_COLOR}]{args.approx}[/{P_COLOR}]'
        f'\n\tFrom Date:\t\t[{P_COLOR}]{args.from_date}[/{P_COLOR}]'
        f'\n\tTo Date:\t\t[{P_COLOR}]{args.to_date}[/{P_COLOR}]'
        f'\n\tMax List Output:\t[{P_COLOR}]{args.max_top}[/{P_COLOR}]'
        f'\n\tOutput File:\t\t[{P_COLOR}]{args.out}[/{P_COLOR}]'
+       f'\n\tReport Formats:\t\t[{P_COLOR}]{", ".join(args.format)}'
+       f'[/{P_COLOR}]'
+       f'\n\tCache File:\t\t[{P_COLOR}]{args.cache}[/{P_COLOR}]'
+       f'\n\tCheckpoint Seconds:\t[{P_COLOR}]{args.checkpoint}[/{P_COLOR}]'
+       f'\n\tResume Checkpoint:\t[{P_COLOR}]{args.resume}[/{P_COLOR}]'
+       f'\n\tWatch Seconds:\t\t[{P_COLOR}]{args.watch}[/{P_COLOR}]'
+       f'\n\tDump File:\t\t[{P_COLOR}]{args.dump}[/{P_COLOR}]'
+       f'\n\tReplay Dump File:\t[{P_COLOR}]{args.from_dump}[/{P_COLOR}]'
+       f'\n\tProfile Report:\t\t[{P_COLOR}]{args.profile}[/{P_COLOR}]'
        f'\n\tEnable Logging Output:\t[{P_COLOR}]{args.logging}[/{P_COLOR}]'
+       f'\n\tHeadless Output:\t[{P_COLOR}]{args.quiet}[/{P_COLOR}]'
        f'\n\tExport Console:\t\t[{P_COLOR}]{args.export_console}[/{P_COLOR}]')
     if args.export_console == 'html':
         rp(f'\tExport Console File:\t[{P_COLOR}]./output/console_{today}.html'
@@ -272,172 +3125,94 @@ def main():
         rp(f'\tExport Console File:\t[{P_COLOR}]./output/console_{today}.txt'
            f'[/{P_COLOR}]\n')
 
-        # Establish read-only reddit variable using PRAW and config_file variables
-    try:
-        reddit = praw.Reddit('read_only')
-        rp('Successfully loaded the reddit information from ./praw.ini',
-           style=G_COLOR)
-    except FileNotFoundError:
-        rp('Warning: Could not load reddit information from config file.\n'
-           'Terminating program.')
-        exit()
-    # retrieve a list of submissions
-    submission_list, comments_list, submissions_date_list = [], [], []
-    if args.submissions:
-        submission_list = sub_submissions(reddit)
-    # Trim the submissions to the date range specified
-    submissions_date_list = date_range_loop(submission_list)
-    total_comments, total_awards, sub_awards, com_awards = 0, 0, 0, 0
-    # Create the t_awd_post_l
-    awd_post_list = submissions_date_list[:]
-    # Converting awd lists to dicts to get unique entries
-    awd_sub_dict = {}
-    for x_var in awd_post_list:
-        if str(x_var[7]) in awd_sub_dict:
-            awd_sub_dict[str(x_var[7])] += x_var[5]
-        else:
-            awd_sub_dict[str(x_var[7])] = x_var[5]
-        total_awards += x_var[5]
-        sub_awards += x_var[5]
-    awd_post_list = [(key, value) for key, value in awd_sub_dict.items()]
-    awd_post_list.sort(key=lambda x: x[1], reverse=True)
-    # Retrieve comments if requested
-    if args.comments:
-        rp('Attempting reddit connection for comments.')
-        f_tuple = sub_comments(reddit, submissions_date_list)
-        # Unpack the f_tuple
-        com_counts_l, com_awards_l = f_tuple[0], f_tuple[5]
-        com_dates_l, sub_counts_l = f_tuple[1], f_tuple[2]
-        sub_dates_l, tot_scores_l = f_tuple[3], f_tuple[4]
-        # Trim the lists to the maximum requested
-        rp(f'Attempting to trim the output lists to the maximum requested: {args.max_top}')
-        t_com_counts_l = com_counts_l[:args.max_top]
-        t_com_dates_l = com_dates_l[:args.max_top]
-        t_sub_counts_l = sub_counts_l[:args.max_top]
-        t_sub_dates_l = sub_dates_l[:args.max_top]
-        t_tot_scores_l = tot_scores_l[:args.max_top]
-        # Get Total Comments
-        for value in com_dates_l:
-            total_comments += value[1]
-        # Get Comment Awards
-        for entry in com_awards_l:
-            if str(entry[0]) in awd_sub_dict:
-                awd_sub_dict[str(entry[0])] += entry[1]
-            else:
-                awd_sub_dict[str(entry[0])] = entry[1]
-            total_awards += entry[1]
-            com_awards += entry[1]
-
-        awd_post_list = [(key, value) for key, value in awd_sub_dict.items()]
-        awd_post_list.sort(key=lambda x: x[1], reverse=True)
+    global profiler
+    profiler = RunProfiler()
+    main_profile = cProfile.Profile() if args.cprofile else None
+    if main_profile:
+        main_profile.enable()
+    # One scheduler for every pipeline and thread keeps the total rate within
+    # the limit
+    scheduler = RequestScheduler(reddit, args.retries)
+    profiler.scheduler = scheduler
+    # A praw.Reddit passed in is shared by every thread
+    clients = RedditClients(lambda: reddit)
+    # Establish read-only reddit clients using PRAW and config_file variables
+    if reddit is None and not args.from_dump:
+        def client() -> praw.Reddit:
+            # The scheduler paces and counts every request of the client's
+            # session, which with --profile also counts the bytes received
+            session = profiler.session() if args.profile \
+                else requests.Session()
+            return praw.Reddit('read_only', requestor_kwargs={
+                'session': scheduler.pace(session)})
 
-    submissions_date_list.sort(key=lambda x: x[3], reverse=True)
-    t_submissions_date_list = submissions_date_list[:args.max_top]
-    awd_post_list_two = submissions_date_list[:]
-    awd_post_list_two.sort(key=lambda x: x[5], reverse=True)
-    total_submissions = len(awd_post_list_two)
-    t_awd_post_l = awd_post_list_two[:args.max_top]
+        try:
+            reddit = client()
+            rp('Successfully loaded the reddit information from ./praw.ini',
+               style=G_COLOR)
+        except FileNotFoundError:
+            rp('Warning: Could not load reddit information from config file.'
+               '\nTerminating program.')
+            exit()
+        clients = RedditClients(client, reddit)
+    clock = profiler.clock(None)
+    if not args.from_dump:
+        with clients.lease() as reddit:
+            connection_test(reddit, scheduler)
+        clock.lap('connection')
+    watches = {name: SubWatch(name) for name in args.reddit} \
+        if args.watch is not None else {}
+    run_batch({name: (sub_pipeline, clients, name, scheduler, replay,
+                      watches.get(name)) for name in args.reddit}, scheduler)
+    if watches:
+        rp(f'Watching {len(watches)} subreddit(s), refreshing every '
+           f'{args.watch:g} seconds. Press Ctrl-C to stop.', style=G_COLOR)
+        # A --to-date of today follows the UTC date of each tick
+        follow = args.to_date >= int(today)
+        ticks, due = 0, time.monotonic() + args.watch
+        try:
+            while True:
+                interrupted.wait(max(0.0, due - time.monotonic()))
+                # A tick longer than the interval delays the next one
+                started = time.monotonic()
+                due = max(due + args.watch, started)
+                ticks += 1
+                if follow:
+                    args.to_date = max(args.to_date,
+                                       int(epoch_date(time.time())))
+                rp("")
+                console.rule(f'Watch Tick {ticks}', style=f'{B_COLOR} bold')
+                rp("")
+                run_batch({name: (watch.tick, clients, scheduler)
+                           for name, watch in watches.items()}, scheduler)
+                rp(f'Tick {ticks} took {time.monotonic() - started:.1f}s, '
+                   f'the next one is due in '
+                   f'{max(0.0, due - time.monotonic()):.0f}s.', style=G_COLOR)
+        except KeyboardInterrupt:
+            rp(f'\nStopped watching after {ticks} ticks.', style=R_COLOR)
+    if args.profile:
+        # Next to the markdown output, or the summary of a batch
+        base = args.summary if len(args.reddit) > 1 \
+            else sub_path(args.out, args.reddit[0])
+        path = f'{os.path.splitext(base)[0]}_profile.json'
+        with open(path, 'w') as f:
+            json.dump(profiler.report(), f, indent=2)
+        rp(f'Wrote the profile report to {path}', style=G_COLOR)
+    if main_profile:
+        main_profile.disable()
+        profiler.dump_stats(args.cprofile, main_profile)
+        rp(f'Wrote the cProfile stats to {args.cprofile}', style=G_COLOR)
 
-    # Output the data
-    rp("")
-    console.rule('Output File', style=f'{B_COLOR} bold')
-    rp("")
-    # Build Tables
-    rp('Structuring Tables.')
-    s_d_l_table = Table(title='Most Popular Posts')
-    s_d_l_table.add_column('Upvotes', justify='right', style=C_COLOR, no_wrap=True)
-    s_d_l_table.add_column('Awards', justify='right', style=G_COLOR, no_wrap=True)
-    s_d_l_table.add_column('Titles', style=M_COLOR)
-    s_d_l_table.add_column('Author', justify='right', style=B_COLOR, no_wrap=True)
-    a_p_l_table = Table(title='Top Awarded Posts')
-    a_p_l_table.add_column('Awards', justify='right', style=G_COLOR, no_wrap=True)
-    a_p_l_table.add_column('Titles', style=M_COLOR)
-    a_p_l_table.add_column('Author', justify='right', style=B_COLOR, no_wrap=True)
-    t_s_table = Table(title='Top Submitters by Author')
-    t_s_table.add_column('Submissions', justify='right', style=G_COLOR, no_wrap=True)
-    t_s_table.add_column('Author', style=M_COLOR)
-    t_c_table = Table(title='Top Comments by Author')
-    t_c_table.add_column('Comments', justify='right', style=G_COLOR, no_wrap=True)
-    t_c_table.add_column('Author', style=M_COLOR)
-    c_u_table = Table(title='Top Upvotes by Author')
-    c_u_table.add_column('Upvotes', justify='right', style=G_COLOR, no_wrap=True)
-    c_u_table.add_column('Author', style=M_COLOR)
-    s_a_table = Table(title='Submissions by Date')
-    s_a_table.add_column('Submissions', justify='right', style=G_COLOR, no_wrap=True)
-    s_a_table.add_column('Date', style=M_COLOR)
-    c_a_table = Table(title='Comments by Date')
-    c_a_table.add_column('Comments', justify='right', style=G_COLOR, no_wrap=True)
-    c_a_table.add_column('Date', style=M_COLOR)
-    # TODO: add a check if file exists
-    rp(f'Attempting to output in Markdown to {args.out} and build tables.')
-    with open(args.out, 'w') as f:
-        f.write(f'# r/{args.reddit} Subreddit Stats for {args.from_date}-'
-                f'{args.to_date}\n\n')
-        f.write((f'## Generic Stats:\nTotal Submissions: **{total_submissions:,}**'
-                 f'\n\nTotal Comments: **{total_comments:,}**\n\nTotal Awards: '
-                 f'**{total_awards}**\n\n'))
-        f.write(f'## Most Popular Posts\n\n')
-        for index, t_sub in enumerate(t_submissions_date_list):
-            f.write(f'{index + 1}. **{t_sub[3]:,}** upvotes: [{t_sub[1]}]'
-                    f'({t_sub[6]}), posted by u/{t_sub[7]}\n')
-            s_d_l_table.add_row(str(t_sub[3]), str(t_sub[5]), str(t_sub[1]),
-                                str(t_sub[7]))
-        if args.comments:
-            f.write('\n## Top Posts by Awards\n\n')
-            for index, t_sub in enumerate(t_awd_post_l):
-                f.write(f'{index + 1}. **{t_sub[5]}** award(s) for [{t_sub[1]}]'
-                        f'({t_sub[6]}), submitted by u/{t_sub[7]}\n')
-                a_p_l_table.add_row(str(t_sub[5]), str(t_sub[1]), str(t_sub[7]))
-            f.write('\n## Top Submitters\n\n')
-            for index, t_sub in enumerate(t_sub_counts_l):
-                f.write(f'{index + 1}. **{t_sub[1]:,}** submissions by u/{t_sub[0]}\n')
-                t_s_table.add_row(str(t_sub[1]), str(t_sub[0]))
-            f.write('\n## Top Commenters\n\n')
-            for index, t_sub in enumerate(t_com_counts_l):
-                f.write(f'{index + 1}. **{t_sub[1]:,}** comments by u/{t_sub[0]}\n')
-                t_c_table.add_row(str(t_sub[1]), str(t_sub[0]))
-            f.write('\n## Cumulative Upvotes (Post & Comments) within this sub'
-                    ' by Author\n\n')
-            for index, t_sub in enumerate(t_tot_scores_l):
-                f.write(f'{index + 1}. **{t_sub[1]:,}** upvotes to u/{t_sub[0]}\n')
-                c_u_table.add_row(str(t_sub[1]), str(t_sub[0]))
-            f.write(f'\n## Submission Activity - Most Active Days:\n')
-            for index, t_sub in enumerate(t_sub_dates_l):
-                f.write(f'{index + 1}. **{t_sub[1]:,}** submissions on **{t_sub[0]}**\n')
-                s_a_table.add_row(str(t_sub[1]), str(t_sub[0]))
-            f.write(f'\n## Comments Activity - Most Active Days:\n')
-            for index, t_sub in enumerate(t_com_dates_l):
-                f.write(f'{index + 1}. **{t_sub[1]:,}** comments on **{t_sub[0]}**\n')
-                c_a_table.add_row(str(t_sub[1]), str(t_sub[0]))
-    rp('\nSuccessfully completed writing to file.\n', style=G_COLOR)
-    rp('Printing Tables')
-    rp("")
-    console.rule('Output Tables', style=f'{B_COLOR} bold')
-    rp("")
-    rp(f'\tTotal Submissions:\t{total_submissions:,}'
-       f'\n\tTotal Comments:\t\t{total_comments:,}\n\tTotal Awards:\t\t'
-       f'{total_awards}\n\tSubmission Awards:\t{sub_awards}\n\t'
-       f'Comment Awards:\t\t{com_awards}\n')
-    rp(s_d_l_table)
-    rp(a_p_l_table)
-    rp(t_s_table)
-    rp(t_c_table)
-    rp(c_u_table)
-    rp(s_a_table)
-    rp(c_a_table)
-    rp('Tables Complete.', style=G_COLOR)
-
-    # At the end, dump console output to console.txt if requested
-    if args.export_console == 'html':
-        console.save_html(f'./output/console_{today}.html')
-    elif args.export_console == 'txt':
-        console.save_text(f'./output/console_{today}.txt')
     rp('Exiting Application.')
 
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
-if __name__ == '__main__':
-
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Build the command line parser and parse the arguments.
+    :param argv: the arguments to parse, sys.argv when None
+    :return: the parsed arguments
+    """
     parser = argparse.ArgumentParser(
         prog=__prog__,
         description=f'{ver}: {__purpose__}',
@@ -450,8 +3225,10 @@ if __name__ == '__main__':
     o_args = parser.add_argument_group('optional arguments')
     r_args.add_argument('-r',
                         '--reddit',
-                        help='specify the subreddit',
+                        help='specify the subreddit, or several to run them '
+                             'as one batch',
                         metavar='subreddit',
+                        nargs='+',
                         type=str)
     # o_args.add_argument('-sort',
     #                     '--sort',
@@ -460,9 +3237,10 @@ if __name__ == '__main__':
     #                     type=str)
     o_args.add_argument('-s',
                         '--submissions',
-                        help='num of submissions to retrieve (max: 1000)',
-                        metavar='(1 to 1000)',
-                        type=int,
+                        help='num of submissions to retrieve (max: 1000), or '
+                             '"auto" to retrieve back to the from date',
+                        metavar='(1 to 1000|auto)',
+                        type=submissions_arg,
                         default=100)
     o_args.add_argument('-c',
                         '--comments',
@@ -472,18 +3250,67 @@ if __name__ == '__main__':
                         type=int,
                         required=False,
                         default=0)
+    o_args.add_argument('--comment-budget',
+                        help='split this many MoreComments expansions (API '
+                             'requests) across the posts by their listed '
+                             'comments instead of expanding each post up to '
+                             '-c, busiest posts first (-c defaults to 1000)',
+                        metavar='N',
+                        type=int)
+    o_args.add_argument('-w',
+                        '--workers',
+                        help='num of submissions to fetch comments from '
+                             'concurrently (shares one API rate limit)',
+                        metavar='N',
+                        type=int,
+                        default=1)
+    o_args.add_argument('--reddit-file',
+                        help='read more subreddits from a file, one per line',
+                        metavar='<subreddit_file>',
+                        required=False)
+    o_args.add_argument('-b',
+                        '--batch-workers',
+                        help='num of subreddits to process concurrently, '
+                             'each with its own API client (shares one API '
+                             'rate limit)',
+                        metavar='N',
+                        type=int,
+                        default=1)
+    o_args.add_argument('--retries',
+                        help='retries of a request failing with a server, '
+                             'throttling or network error',
+                        metavar='N',
+                        type=int,
+                        default=5)
+    o_args.add_argument('--profile',
+                        help='write the wall time, API requests, bytes, '
+                             'comments/s and peak memory of every stage and '
+                             'submission to a JSON file next to the output',
+                        action='store_true')
+    o_args.add_argument('--cprofile',
+                        help='also write cProfile stats of the run to a file',
+                        metavar='<stats_file>')
+    o_args.add_argument('--approx',
+                        help='count the author leaderboards in this many '
+                             'counters each (Space-Saving) and estimate the '
+                             'unique commenters (HyperLogLog), bounding memory '
+                             'on subs with millions of authors',
+                        metavar='COUNTERS',
+                        nargs='?',
+                        type=int,
+                        const=APPROX_COUNTERS)
     o_args.add_argument('-f',
                         '--from-date',
-                        help='oldest post date as YYMMDD',
+                        help='oldest post date as YYMMDD, when not given today '
+                             'or the from date of --from-dump',
                         metavar='YYMMDD',
-                        type=int,
-                        default=today)
+                        type=int)
     o_args.add_argument('-t',
                         '--to-date',
-                        help='newest post date as YYMMDD',
+                        help='newest post date as YYMMDD, when not given today '
+                             'or the to date of --from-dump',
                         metavar='YYMMDD',
-                        type=int,
-                        default=today)
+                        type=int)
     o_args.add_argument('-m',
                         '--max-top',
                         help='maximum top entries per list to output',
@@ -495,31 +3322,111 @@ if __name__ == '__main__':
                         help='saves a copy of the console to ./output folder',
                         choices=['txt', 'html'],
                         required=False)
+    o_args.add_argument('--cache',
+                        help='keep retrieved submissions and comments in an '
+                             'SQLite file and only re-fetch what changed',
+                        metavar='<cache_file>',
+                        nargs='?',
+                        const=CACHE_FILE,
+                        required=False)
+    o_args.add_argument('--refresh-hours',
+                        help='cached posts younger than this are re-fetched',
+                        metavar='HOURS',
+                        type=float,
+                        default=24)
+    o_args.add_argument('--rollups',
+                        help='keep the comment counts of each settled day in '
+                             'the cache and merge them instead of counting '
+                             'those posts again (implies --cache)',
+                        action='store_true')
+    o_args.add_argument('--checkpoint',
+                        help='save the counted submissions and their counts '
+                             'in the folder of -out every SECONDS while '
+                             'retrieving comments, and when a run fails or '
+                             'is interrupted',
+                        metavar='SECONDS',
+                        nargs='?',
+                        type=float,
+                        const=CHECKPOINT_SECONDS)
+    o_args.add_argument('--resume',
+                        help='continue from the checkpoint of an interrupted '
+                             'run with the same arguments instead of '
+                             'fetching its submissions again (implies '
+                             '--checkpoint)',
+                        action='store_true')
+    o_args.add_argument('--watch',
+                        help='keep running after the first pass: every '
+                             'SECONDS count the new comments of the '
+                             'subreddit\'s comment stream into the same '
+                             'counters, list the posts again and rewrite the '
+                             'reports, until Ctrl-C',
+                        metavar='SECONDS',
+                        type=float)
+    o_args.add_argument('--dump',
+                        help='record the retrieved submissions and comments '
+                             'to a JSON lines file',
+                        metavar='<dump_file>',
+                        required=False)
+    o_args.add_argument('--from-dump',
+                        help='replay a file recorded with --dump instead of '
+                             'querying reddit',
+                        metavar='<dump_file>',
+                        required=False)
     o_args.add_argument('-l',
                         '--logging',
                         help='switches output to logging format',
                         action='store_true')
+    o_args.add_argument('-q',
+                        '--quiet',
+                        help='headless: skip the progress bars and output '
+                             'tables, only write the reports',
+                        action='store_true')
     o_args.add_argument('-h',
                         '--help',
                         help='show this help message and exit',
                         action='help')
     o_args.add_argument('-out',
                         metavar='<output_file>',
-                        help='specify the output filename (example: '
+                        help='specify the output filename, {subreddit} is '
+                             'replaced by the subreddit name (example: '
                              './output/reddit_{subreddit}_{today}.txt)',
                         required=False)
+    o_args.add_argument('--format',
+                        help='report formats: the markdown lists, or the full '
+                             'tables as json, csv or parquet (needs pyarrow),'
+                             ' written next to -out',
+                        nargs='+',
+                        choices=list(REPORT_WRITERS),
+                        default=['markdown'])
+    o_args.add_argument('--summary',
+                        metavar='<summary_file>',
+                        help='the combined summary of a batch of subreddits '
+                             '(example: ./output/reddit_batch_{today}.txt)',
+                        required=False)
     o_args.add_argument('--version',
                         help='print the version and exit',
                         action='version',
                         version=f'{ver}')
+    return parser.parse_args(argv)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+if __name__ == '__main__':
+
     # Define args globally to make it available elsewhere
-    args = parser.parse_args()
+    args = parse_args()
     # This overrides an argument: parser.set_defaults(bar=42, baz='badger')
     # Enable rich console export, traceback handler, and logging if requested
     if args.export_console:
-        console = Console(record=True)
-    install()
-    if args.logging:
-        rp = console.log
+        console = LazyConsole(record=True)
+        export = ConsoleExport(
+            console, f'./output/console_{today}.{args.export_console}',
+            args.export_console)
+    sys.excepthook = rich_excepthook
 
-    main()
+    try:
+        main()
+    finally:
+        # The console was streamed to the export file, write out the rest
+        if export:
+            export.close()
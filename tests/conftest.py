@@ -0,0 +1,79 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sub_stats_script  # noqa: E402
+
+
+@pytest.fixture
+def sss(monkeypatch):
+    """
+    The script module with the default arguments of a single subreddit run
+    and a fresh RunProfiler; tests override single arguments with
+    monkeypatch.setattr(sss.args, ...).
+    """
+    monkeypatch.setattr(sub_stats_script, 'args',
+                        sub_stats_script.parse_args(['-r', 'test']),
+                        raising=False)
+    monkeypatch.setattr(sub_stats_script, 'profiler',
+                        sub_stats_script.RunProfiler())
+    return sub_stats_script
+
+
+def fake_post(sub_id, created_utc, score=10, num_comments=0,
+              author='author'):
+    """A praw Submission stand-in with the fields the script reads."""
+    return SimpleNamespace(
+        id=sub_id, fullname=f't3_{sub_id}', created_utc=created_utc,
+        title=f'title {sub_id}', num_comments=num_comments, score=score,
+        upvote_ratio=0.9, total_awards_received=0,
+        permalink=f'/r/test/{sub_id}', author=author, comments=[])
+
+
+def fake_comment(com_id, sub_id, created_utc, author='commenter', score=1):
+    """A praw Comment stand-in, without replies."""
+    return SimpleNamespace(
+        id=com_id, fullname=f't1_{com_id}', link_id=f't3_{sub_id}',
+        author=author, score=score, total_awards_received=0,
+        created_utc=created_utc, replies=[])
+
+
+class FakeReddit:
+    """
+    A praw.Reddit stand-in serving the posts and the comment stream of one
+    subreddit, newest first. Listings resume after params['after'] like
+    reddit's, and each item index in fail raises a 503, as a listing page
+    failing halfway, once for every time it is listed. calls records the
+    (kind, after) of each listing and served counts the items yielded.
+    """
+
+    def __init__(self, posts=(), stream=()):
+        self.posts, self.stream = list(posts), list(stream)
+        self.fail, self.calls, self.served = [], [], 0
+
+    def subreddit(self, name):
+        return SimpleNamespace(
+            new=lambda limit, params=None:
+            self.listing(self.posts, 'new', limit, params),
+            comments=lambda limit, params=None:
+            self.listing(self.stream, 'comments', limit, params))
+
+    def listing(self, items, kind, limit, params):
+        after = (params or {}).get('after')
+        self.calls.append((kind, after))
+        start = [item.fullname for item in items].index(after) + 1 \
+            if after else 0
+        for index in range(start, min(start + limit, len(items))):
+            if index in self.fail:
+                self.fail.remove(index)
+                raise sub_stats_script.prawcore.exceptions.ServerError(
+                    SimpleNamespace(status_code=503, headers={}))
+            self.served += 1
+            yield items[index]
+
+    def submission(self, id):
+        return next(post for post in self.posts if post.id == id)
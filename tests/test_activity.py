@@ -0,0 +1,71 @@
+import datetime
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+
+def reference(timestamps):
+    """The per-comment datetime bucketing count_hours and activity replace."""
+    dates = [datetime.datetime.utcfromtimestamp(t) for t in timestamps]
+    return (Counter(date.strftime('%Y-%m-%d') for date in dates),
+            Counter(date.strftime('%H:00') for date in dates),
+            Counter(date.strftime('%A') for date in dates))
+
+
+def bucketed(sss, timestamps):
+    hours = defaultdict(int)
+    count_hours(sss, timestamps, hours)
+    days, by_hour, by_weekday = sss.activity(hours)
+    # activity lists every hour and weekday, the reference only the seen ones
+    return (Counter(days), Counter({k: v for k, v in by_hour.items() if v}),
+            Counter({k: v for k, v in by_weekday.items() if v}))
+
+
+def count_hours(sss, timestamps, hours):
+    # Batches of at most NUMPY_BATCH - 1 stay on the plain Python path
+    step = sss.NUMPY_BATCH - 1
+    for i in range(0, len(timestamps), step):
+        sss.count_hours(timestamps[i:i + step], hours)
+
+
+@pytest.fixture
+def timestamps():
+    rng = random.Random(17)
+    # Two years around 2021, with the hour and day boundaries themselves
+    stamps = [rng.randrange(1_577_836_800, 1_640_995_200)
+              for _ in range(5000)]
+    return stamps + [1_609_459_200, 1_609_459_199, 1_609_462_800, 0]
+
+
+def test_matches_the_datetime_bucketing(sss, timestamps):
+    assert bucketed(sss, timestamps) == reference(timestamps)
+
+
+def test_activity_orders_hours_and_weekdays(sss):
+    # Thursday 1970-01-01 00:00 and Monday 2021-01-04 23:00
+    days, by_hour, by_weekday = sss.activity({0: 2, 447_167: 1})
+    assert days == {'1970-01-01': 2, '2021-01-04': 1}
+    assert list(by_hour) == [f'{hour:02}:00' for hour in range(24)]
+    assert by_hour['00:00'] == 2 and by_hour['23:00'] == 1
+    assert list(by_weekday) == list(sss.WEEKDAYS)
+    assert by_weekday == {**dict.fromkeys(sss.WEEKDAYS, 0),
+                          'Thursday': 2, 'Monday': 1}
+
+
+def test_large_batches_without_numpy(sss, timestamps, monkeypatch):
+    monkeypatch.setattr(sss, 'numpy_missing', False)
+    monkeypatch.setattr(sss, 'numpy', sss.LazyModule('numpy_not_installed'))
+    hours = defaultdict(int)
+    sss.count_hours(timestamps, hours)
+    assert sss.numpy_missing
+    assert hours == Counter(t // 3600 for t in timestamps)
+
+
+def test_large_batches_with_numpy(sss, timestamps, monkeypatch):
+    pytest.importorskip('numpy')
+    monkeypatch.setattr(sss, 'numpy_missing', False)
+    hours = defaultdict(int)
+    sss.count_hours(timestamps, hours)
+    assert not sss.numpy_missing
+    assert hours == Counter(t // 3600 for t in timestamps)
@@ -0,0 +1,116 @@
+import json
+import random
+from collections import Counter
+
+
+def test_space_saving_is_exact_within_capacity(sss):
+    sketch = sss.SpaceSaving(10)
+    for key, weight in [('a', 3), ('b', 1), ('a', 2), ('c', 7)]:
+        sketch.add(key, weight)
+    assert dict(sketch.items()) == {'a': 5, 'b': 1, 'c': 7}
+    assert sketch.total == 13
+
+
+def test_space_saving_evicts_the_smallest_counter(sss):
+    sketch = sss.SpaceSaving(2)
+    sketch.add('a', 10)
+    sketch.add('b', 5)
+    sketch.add('c', 1)
+    # c inherits the count of b, the smallest, plus its own weight
+    assert dict(sketch.items()) == {'a': 10, 'c': 6}
+
+
+def test_space_saving_evicts_a_key_lowered_by_a_negative_weight(sss):
+    sketch = sss.SpaceSaving(2)
+    sketch.add('a', 10)
+    sketch.add('b', 5)
+    sketch.add('a', -8)
+    sketch.add('c', 1)
+    assert dict(sketch.items()) == {'b': 5, 'c': 3}
+
+
+def test_space_saving_ignores_negative_weights_of_untracked_keys(sss):
+    sketch = sss.SpaceSaving(2)
+    sketch.add('a', 10)
+    sketch.add('b', -4)
+    assert dict(sketch.items()) == {'a': 10}
+    assert sketch.total == 10
+
+
+def test_space_saving_error_bounds(sss):
+    rng = random.Random(7)
+    capacity, truth, sketch = 50, Counter(), sss.SpaceSaving(50)
+    for _ in range(20000):
+        key = f'u{int(rng.paretovariate(1.2))}'
+        truth[key] += 1
+        sketch.add(key)
+    bound = sketch.total / capacity
+    counts = dict(sketch.items())
+    assert len(counts) == capacity
+    for key, true in truth.items():
+        if true > bound:
+            assert key in counts
+    for key, count in counts.items():
+        assert truth[key] <= count <= truth[key] + bound
+
+
+def test_space_saving_state_round_trip(sss):
+    sketch = sss.SpaceSaving(3)
+    for key, weight in [('a', 4), ('b', 2), ('c', 1), ('d', 5)]:
+        sketch.add(key, weight)
+    restored = sss.SpaceSaving.from_state(
+        json.loads(json.dumps(sketch.state())))
+    for target in (sketch, restored):
+        target.add('e', 1)
+    assert dict(restored.items()) == dict(sketch.items())
+    assert restored.total == sketch.total
+
+
+def test_hyperloglog_counts_small_sets_exactly_enough(sss):
+    sketch = sss.HyperLogLog()
+    for i in range(1000):
+        sketch.add(f'user{i}')
+        sketch.add(f'user{i}')
+    assert abs(sketch.estimate() - 1000) <= 10
+
+
+def test_hyperloglog_standard_error(sss):
+    sketch = sss.HyperLogLog()
+    for i in range(200000):
+        sketch.add(f'user{i}')
+    # Four standard errors of 0.81%
+    assert abs(sketch.estimate() - 200000) / 200000 < 0.033
+
+
+def test_hyperloglog_empty(sss):
+    assert sss.HyperLogLog().estimate() == 0
+
+
+def test_approx_stats_match_exact_stats_within_capacity(sss):
+    # Negative scores of untracked authors are dropped, see above
+    records = [(f'c{i}', f'u{i % 7}', i % 5, i % 2, 1600000000 + i * 600)
+               for i in range(300)]
+    exact, approx = sss.CommentStats(), sss.ApproxCommentStats(100)
+    exact.consume(records)
+    approx.consume(records)
+    assert dict(approx.com_counts.items()) == dict(exact.com_counts)
+    assert dict(approx.tot_scores.items()) == dict(exact.tot_scores)
+    assert dict(approx.com_hours) == dict(exact.com_hours)
+    assert approx.total_awards() == exact.total_awards()
+    assert approx.unique_commenters() == exact.unique_commenters() == 7
+
+
+def test_approx_stats_state_round_trip(sss):
+    records = [(f'c{i}', f'u{i % 40}', i % 9, 0, 1600000000 + i * 60)
+               for i in range(500)]
+    stats = sss.ApproxCommentStats(20)
+    stats.consume(records[:250])
+    restored = sss.ApproxCommentStats.from_state(
+        json.loads(json.dumps(stats.state())))
+    for target in (stats, restored):
+        target.consume(records[250:])
+    assert dict(restored.com_counts.items()) == dict(stats.com_counts.items())
+    assert dict(restored.tot_scores.items()) == dict(stats.tot_scores.items())
+    assert dict(restored.com_hours) == dict(stats.com_hours)
+    assert restored.unique_commenters() == stats.unique_commenters()
+    assert restored.count == stats.count == 500
@@ -0,0 +1,81 @@
+import pytest
+
+
+@pytest.fixture
+def comments(sss, monkeypatch):
+    # --comment-budget raises -c to 1000
+    monkeypatch.setattr(sss.args, 'comments', 1000)
+    return sss.args
+
+
+def test_posts_held_by_their_first_page_get_nothing(sss, comments):
+    assert sss.allocate_budget({'a': 100, 'b': 500}, 10) == {}
+
+
+def test_expansions_go_to_the_most_missing_comments(sss, comments):
+    # a misses 1000 comments (10 expansions), b misses 300 (3)
+    posts = {'a': 1500, 'b': 800, 'c': 20}
+    assert sss.allocate_budget(posts, 5) == {'a': 5}
+    # Ties go to the lowest submission ID
+    assert sss.allocate_budget(posts, 8) == {'a': 8}
+    assert sss.allocate_budget(posts, 9) == {'a': 8, 'b': 1}
+    assert sss.allocate_budget(posts, 13) == {'a': 10, 'b': 3}
+
+
+def test_expansions_stop_at_what_a_post_needs(sss, comments):
+    limits = sss.allocate_budget({'a': 1500, 'b': 800}, 50)
+    assert limits == {'a': 10, 'b': 3}
+
+
+def test_expansions_stop_at_the_comment_limit(sss, comments, monkeypatch):
+    monkeypatch.setattr(sss.args, 'comments', 4)
+    assert sss.allocate_budget({'a': 50000, 'b': 1000}, 20) == {'a': 4,
+                                                                'b': 4}
+
+
+def test_zero_budget(sss, comments):
+    assert sss.allocate_budget({'a': 50000}, 0) == {}
+
+
+def test_budget_keeps_the_unallocated_expansions_spare(sss, comments):
+    budget = sss.CommentBudget({'a': 1500, 'b': 800, 'c': 20}, 20)
+    assert dict(budget.limits) == {'a': 10, 'b': 3}
+    assert budget.spare == 7
+
+
+def test_take_returns_the_allocation(sss, comments):
+    budget = sss.CommentBudget({'a': 1500, 'b': 800}, 13)
+    assert budget.take('a', 10) == 10
+    assert budget.take('a', 10) == 0
+    assert budget.spare == 0
+
+
+def test_take_gives_back_an_unneeded_allocation(sss, comments):
+    budget = sss.CommentBudget({'a': 1500, 'b': 800}, 13)
+    assert budget.take('a', 0) == 0
+    assert budget.spare == 10
+    # b turns out to have more MoreComments than expected
+    assert budget.take('b', 8) == 8
+    assert budget.spare == 5
+
+
+def test_take_draws_spares_up_to_the_comment_limit(sss, comments,
+                                                   monkeypatch):
+    budget = sss.CommentBudget({'a': 20}, 100)
+    monkeypatch.setattr(sss.args, 'comments', 6)
+    assert budget.take('a', 50) == 6
+    assert budget.spare == 94
+    assert budget.take('new', 2) == 2
+    assert budget.spare == 92
+
+
+def test_granted_expansions_are_spent_once_settled(sss, comments):
+    budget = sss.CommentBudget({'a': 1500, 'b': 800}, 13, spent=7)
+    assert budget.take('a', 10) == 10
+    assert budget.take('b', 0) == 0
+    assert budget.spent == 7
+    budget.settle('a')
+    budget.settle('b')
+    assert budget.spent == 17
+    budget.settle('a')
+    assert budget.spent == 17
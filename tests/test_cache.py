@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pytest
+
+HOUR = 3600
+T0 = 1_600_000_000
+
+
+def post(sub_id='p1', created_utc=T0, num_comments=1):
+    return SimpleNamespace(
+        id=sub_id, created_utc=created_utc, title='title',
+        num_comments=num_comments, score=10, upvote_ratio=0.9,
+        total_awards_received=0, permalink=f'/r/test/{sub_id}',
+        author='author')
+
+
+@pytest.fixture
+def cache(sss, tmp_path):
+    cache = sss.SubCache(str(tmp_path / 'cache.db'), 24)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def clock(sss, monkeypatch):
+    now = [T0]
+    monkeypatch.setattr(sss.time, 'time', lambda: now[0])
+    return now
+
+
+def test_young_post_is_not_settled(cache, clock):
+    clock[0] = T0 + 2 * HOUR
+    cache.put_submission('test', post())
+    assert not cache.is_settled('p1')
+    clock[0] = T0 + 30 * HOUR
+    cache.put_submission('test', post())
+    assert cache.is_settled('p1')
+
+
+def test_settled_comments_are_reused(cache, clock):
+    clock[0] = T0 + 30 * HOUR
+    cache.put_submission('test', post())
+    cache.put_comments('p1', [('c1', 'a', 1, 0, T0 + HOUR)], 100)
+    assert cache.comments('p1', 100) == [('c1', 'a', 1, 0, T0 + HOUR)]
+    assert cache.comments('p1', 50) is not None
+
+
+def test_comments_of_a_higher_limit_are_fetched_again(cache, clock):
+    clock[0] = T0 + 30 * HOUR
+    cache.put_submission('test', post())
+    cache.put_comments('p1', [('c1', 'a', 1, 0, T0 + HOUR)], 100)
+    assert cache.comments('p1', 200) is None
+
+
+def test_comments_fetched_young_are_fetched_again(cache, clock):
+    clock[0] = T0 + 2 * HOUR
+    cache.put_submission('test', post())
+    cache.put_comments('p1', [('c1', 'a', 1, 0, T0 + HOUR)], 100)
+    # The post settles, the comments captured when it was 2 hours old don't
+    clock[0] = T0 + 30 * HOUR
+    cache.put_submission('test', post(num_comments=500))
+    assert cache.is_settled('p1')
+    assert cache.comments('p1', 100) is None
+    cache.put_comments('p1', [('c1', 'a', 1, 0, T0 + HOUR),
+                              ('c2', 'b', 2, 0, T0 + 5 * HOUR)], 100)
+    assert len(cache.comments('p1', 100)) == 2
+
+
+def test_uncached_post_has_no_comments(cache):
+    assert cache.comments('missing', 100) is None
+    assert not cache.is_settled('missing')
+
+
+def test_listing_spans_cover_only_what_was_paged(cache):
+    cache.put_listing('test', 100, 200)
+    assert cache.covered('test', 150, 120)
+    assert cache.covered('Test', 200, 100)
+    assert not cache.covered('test', 150, 90)
+    assert not cache.covered('test', 250, 120)
+    assert not cache.covered('other', 150, 120)
+
+
+def test_overlapping_listing_spans_merge(cache):
+    cache.put_listing('test', 100, 200)
+    cache.put_listing('test', 300, 400)
+    assert not cache.covered('test', 350, 150)
+    cache.put_listing('test', 150, 350)
+    assert cache.covered('test', 400, 100)
+    assert cache.db.execute('SELECT COUNT(*) FROM listings').fetchone()[0] \
+        == 1
+
+
+def test_submissions_from_reads_newest_first(cache, clock):
+    clock[0] = T0 + 30 * HOUR
+    for i in range(5):
+        cache.put_submission('test', post(f'p{i}', T0 - i * HOUR))
+    rows = cache.submissions_from('test', T0 - HOUR, T0 - 3 * HOUR, 10)
+    assert [row[-1] for row in rows] == ['p1', 'p2', 'p3']
+    assert len(cache.submissions_from('test', T0, 0, 2)) == 2
+
+
+def test_rollup_round_trip(sss, cache):
+    stats = sss.CommentStats()
+    stats.consume([('c1', 'a', 5, 1, T0), ('c2', 'b', 2, 0, T0 + HOUR),
+                   ('c3', 'a', 1, 0, T0 + HOUR)])
+    day = T0 // 86400
+    cache.put_rollup('test', day, stats, 100)
+    assert cache.rollup_days('test', 100) == {day}
+    assert cache.rollup_days('test', 200) == set()
+    merged = cache.rollup('test', [day])
+    assert merged.count == 3
+    assert dict(merged.com_counts) == {'a': 2, 'b': 1}
+    assert dict(merged.tot_scores) == {'a': 6, 'b': 2}
+    assert dict(merged.com_hours) == dict(stats.com_hours)
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+RUN = {'subreddit': 'test', 'from_date': 201201, 'to_date': 201231,
+       'comments': 100, 'approx': None, 'rollups': False,
+       'comment_budget': None}
+RECORDS = [('c1', 'a', 5, 1, 1600000000), ('c2', 'b', -1, 0, 1600003600),
+           ('c3', 'a', 2, 0, 1600003700)]
+
+
+@pytest.fixture
+def path(sss, tmp_path, monkeypatch):
+    monkeypatch.setattr(sss.args, 'checkpoint', 60)
+    return str(tmp_path / 'run_checkpoint.json')
+
+
+def test_round_trip(sss, path):
+    stats, day_stats = sss.CommentStats(), {18500: sss.CommentStats()}
+    stats.consume(RECORDS)
+    day_stats[18500].consume(RECORDS[:1])
+    coverage = {'p1': (3, 100), 'p2': (1, None)}
+    sss.Checkpoint(path, RUN).save({'p1', 'p2'}, stats, day_stats, coverage,
+                                   12, force=True)
+    done, loaded, days, loaded_coverage, spent = \
+        sss.Checkpoint(path, RUN).load()
+    assert done == {'p1', 'p2'}
+    assert loaded_coverage == coverage
+    assert spent == 12
+    assert dict(loaded.tot_scores) == {'a': 7, 'b': -1}
+    assert dict(loaded.com_counts) == {'a': 2, 'b': 1}
+    assert dict(loaded.com_hours) == dict(stats.com_hours)
+    assert loaded.count == 3
+    assert list(days) == [18500] and days[18500].count == 1
+    assert not os.path.exists(f'{path}.tmp')
+
+
+def test_round_trip_approx(sss, path):
+    run = dict(RUN, approx=50)
+    stats = sss.ApproxCommentStats(50)
+    stats.consume(RECORDS)
+    sss.Checkpoint(path, run).save({'p1'}, stats, {}, {}, force=True)
+    _, loaded, _, _, spent = sss.Checkpoint(path, run).load()
+    assert spent == 0
+    assert isinstance(loaded, sss.ApproxCommentStats)
+    assert dict(loaded.com_counts.items()) == {'a': 2, 'b': 1}
+    assert loaded.unique_commenters() == 2
+
+
+def test_other_run_is_not_resumed(sss, path):
+    sss.Checkpoint(path, RUN).save(set(), sss.CommentStats(), {}, {},
+                                   force=True)
+    assert sss.Checkpoint(path, dict(RUN, comments=200)).load() is None
+
+
+def test_missing_checkpoint_warns(sss, tmp_path, monkeypatch):
+    printed = []
+    monkeypatch.setattr(sss, 'rp', lambda *a, **kw: printed.extend(a))
+    (tmp_path / 'checkpoint_test_201101-201130.json').write_text('{}')
+    (tmp_path / 'checkpoint_other_201201-201231.json').write_text('{}')
+    path = str(tmp_path / 'checkpoint_test_201201-201231.json')
+    assert sss.Checkpoint(path, RUN).load() is None
+    assert printed == [
+        f'Warning: No checkpoint {path} to resume, starting over. '
+        f'Checkpoints of other date ranges: '
+        f'checkpoint_test_201101-201130.json']
+
+
+def test_path_follows_the_date_range_not_out(sss, monkeypatch):
+    monkeypatch.setattr(sss.args, 'from_date', 101)
+    monkeypatch.setattr(sss.args, 'to_date', 201231)
+    for out in './output/reddit_Test_201231.txt', \
+            './output/reddit_Test_210101.txt':
+        assert sss.checkpoint_path(out, 'Test') == \
+            os.path.join('./output', 'checkpoint_test_000101-201231.json')
+
+
+def test_saves_are_spaced_unless_forced(sss, path):
+    checkpoint = sss.Checkpoint(path, RUN)
+    checkpoint.save({'p1'}, sss.CommentStats(), {}, {})
+    assert not os.path.exists(path)
+    checkpoint.save({'p1'}, sss.CommentStats(), {}, {}, force=True)
+    checkpoint.save({'p1', 'p2'}, sss.CommentStats(), {}, {})
+    assert sss.Checkpoint(path, RUN).load()[0] == {'p1'}
+
+
+def test_remove(sss, path):
+    checkpoint = sss.Checkpoint(path, RUN)
+    checkpoint.save(set(), sss.CommentStats(), {}, {}, force=True)
+    checkpoint.remove()
+    assert not os.path.exists(path)
+    checkpoint.remove()
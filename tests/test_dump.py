@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from conftest import FakeReddit, fake_comment, fake_post
+
+# 2021-01-01 00:00 UTC
+T0 = 1_609_459_200
+
+
+@pytest.fixture
+def reddit():
+    posts = []
+    for i in range(6):
+        post = fake_post(f'p{i}', T0 - 3600 - i * 7200, score=10 * i,
+                         num_comments=i, author=f'author{i % 2}')
+        post.comments = [fake_comment(f'p{i}c{j}', post.id,
+                                      post.created_utc + 60 * j,
+                                      author=f'user{j}', score=j)
+                         for j in range(i)]
+        posts.append(post)
+    return FakeReddit(posts)
+
+
+@pytest.fixture
+def run(sss, monkeypatch, tmp_path):
+    monkeypatch.setattr(sss.args, 'comments', 100)
+    monkeypatch.setattr(sss.args, 'from_date', 201231)
+    monkeypatch.setattr(sss.args, 'to_date', 201231)
+    monkeypatch.setattr(sss.args, 'format', ['markdown', 'json'])
+    monkeypatch.setattr(sss.args, 'reddit', ['test'])
+    return tmp_path
+
+
+def test_replay_reproduces_the_recorded_run(sss, monkeypatch, reddit, run):
+    scheduler = sss.RequestScheduler(reddit, 0)
+    monkeypatch.setattr(sss.args, 'out', str(run / 'live.txt'))
+    monkeypatch.setattr(sss.args, 'dump', str(run / 'dump.jsonl'))
+    live = sss.sub_pipeline(sss.RedditClients(lambda: reddit), 'test',
+                            scheduler)
+
+    info, posts, comments = sss.read_dump(str(run / 'dump.jsonl'))
+    assert (info['subreddit'], info['comments'], info['from_date'],
+            info['to_date']) == ('test', 100, 201231, 201231)
+    assert [fields[-1] for fields in posts] == [f'p{i}' for i in range(6)]
+    assert sum(map(len, comments.values())) == 15
+    monkeypatch.setattr(sss.args, 'out', str(run / 'replay.txt'))
+    monkeypatch.setattr(sss.args, 'dump', None)
+    monkeypatch.setattr(sss.args, 'from_dump', str(run / 'dump.jsonl'))
+    replayed = sss.sub_pipeline(sss.RedditClients(lambda: None), 'test',
+                                scheduler, (posts, comments))
+
+    assert {**live, 'out': None} == {**replayed, 'out': None}
+    assert (run / 'live.txt').read_text() == (run / 'replay.txt').read_text()
+    live_tables = json.loads((run / 'live.json').read_text())['tables']
+    replay_tables = json.loads((run / 'replay.json').read_text())['tables']
+    # The replayed posts were not fetched, so have no replace_more limit
+    for tables in live_tables, replay_tables:
+        tables.pop('coverage')
+    assert live_tables == replay_tables
@@ -0,0 +1,201 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from conftest import FakeReddit, fake_post
+
+T0 = 1_600_000_000
+
+
+def test_observe_fits_the_rate_to_the_headers(sss):
+    scheduler = sss.RequestScheduler(None, 0)
+    scheduler.observe(SimpleNamespace(headers={
+        'x-ratelimit-remaining': '420.0', 'x-ratelimit-used': '180',
+        'x-ratelimit-reset': '300'}))
+    assert scheduler.rate == pytest.approx(1.4, rel=1e-3)
+    usage = scheduler.telemetry()
+    assert usage['remaining'] == 420
+    assert usage['resets_in'] == pytest.approx(300, abs=1)
+
+
+def test_observe_ignores_responses_without_the_headers(sss):
+    scheduler = sss.RequestScheduler(None, 0)
+    scheduler.observe(SimpleNamespace(headers={}))
+    assert scheduler.rate == sss.API_RATE
+    assert scheduler.telemetry()['remaining'] is None
+
+
+def test_update_falls_back_to_praw_limits(sss):
+    now = sss.time.time()
+    reddit = SimpleNamespace(auth=SimpleNamespace(limits={
+        'remaining': 100, 'used': 500, 'reset_timestamp': now + 200}))
+    scheduler = sss.RequestScheduler(reddit, 0)
+    scheduler.update()
+    assert scheduler.rate == pytest.approx(0.5, rel=1e-2)
+
+
+def test_update_leaves_the_rate_without_a_reset_time(sss):
+    reddit = SimpleNamespace(auth=SimpleNamespace(limits={
+        'remaining': 100, 'used': 500}))
+    scheduler = sss.RequestScheduler(reddit, 0)
+    scheduler.update()
+    assert scheduler.rate == sss.API_RATE
+
+
+class HeaderAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with reddit's rate limit headers."""
+
+    def send(self, request, **kw):
+        response = requests.Response()
+        response.status_code, response.request = 200, request
+        response.headers.update({'x-ratelimit-remaining': '420.0',
+                                 'x-ratelimit-reset': '300'})
+        response._content = b'{}'
+        return response
+
+    def close(self):
+        pass
+
+
+def test_pace_counts_every_request_of_the_session(sss):
+    scheduler = sss.RequestScheduler(None, 0)
+    session = requests.Session()
+    session.mount('https://', HeaderAdapter())
+    scheduler.pace(session)
+    for _ in range(3):
+        session.get('https://oauth.reddit.com/r/test/new')
+    assert scheduler.requests == scheduler.thread_requests() == 3
+    assert scheduler.rate == pytest.approx(1.4, rel=1e-3)
+    # The requests count themselves, call() takes no tokens up front
+    scheduler.call(lambda: None, tokens=5)
+    assert scheduler.requests == 3
+
+
+class FlakyForest(list):
+    """
+    A comment forest whose replace_more sends a request per MoreComments
+    and fails with a 503 after the first two.
+    """
+
+    def __init__(self, sss, scheduler):
+        super().__init__([sss.praw.models.MoreComments(None, {
+            'children': [], 'count': 0, 'id': 'm', 'name': 't1_m',
+            'parent_id': 't3_p1', 'depth': 0})])
+        self.scheduler, self.limits = scheduler, []
+        self.error = sss.prawcore.exceptions.ServerError(
+            SimpleNamespace(status_code=503, headers={}))
+
+    def replace_more(self, limit):
+        self.limits.append(limit)
+        for sent in range(limit):
+            self.scheduler.acquire()
+            if len(self.limits) == 1 and sent == 1:
+                raise self.error
+        self.clear()
+
+
+def test_fetch_comments_retries_with_the_requests_left(sss, monkeypatch):
+    monkeypatch.setattr(sss.args, 'comments', 5)
+    monkeypatch.setattr(sss.time, 'sleep', lambda seconds: None)
+    scheduler = sss.RequestScheduler(None, 1)
+    scheduler.paced = True
+    forest = FlakyForest(sss, scheduler)
+    reddit = SimpleNamespace(
+        submission=lambda id: SimpleNamespace(comments=forest))
+    records, limit = sss.fetch_comments(reddit, 'p1', scheduler)
+    assert list(records) == []
+    assert limit == 5
+    assert forest.limits == [5, 3]
+    assert scheduler.requests == 5
+
+
+class PagedPost:
+    """A post whose comments take three requests: its page and two more."""
+
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def comments(self):
+        for _ in range(3):
+            self.session.get('https://oauth.reddit.com/comments/p1')
+        return []
+
+
+def test_submission_requests_are_counted_as_sent(sss):
+    scheduler = sss.RequestScheduler(None, 0)
+    session = requests.Session()
+    session.mount('https://', HeaderAdapter())
+    scheduler.pace(session)
+    reddit = SimpleNamespace(submission=lambda id: PagedPost(session))
+    cost = sss.submission_comments(sss.RedditClients(lambda: reddit), 'p1',
+                                   scheduler)[3]
+    assert cost[1] == scheduler.requests == 3
+
+
+@pytest.fixture
+def no_sleep(sss, monkeypatch):
+    slept = []
+    monkeypatch.setattr(sss.time, 'sleep', slept.append)
+    return slept
+
+
+def test_iter_new_resumes_after_the_last_item(sss, no_sleep):
+    reddit = FakeReddit([fake_post(f'p{i}', T0 - i) for i in range(5)])
+    reddit.fail = [2]
+    scheduler = sss.RequestScheduler(None, 1)
+    posts = list(sss.iter_new(reddit, 'test', scheduler, 5))
+    assert [post.id for post in posts] == ['p0', 'p1', 'p2', 'p3', 'p4']
+    assert reddit.calls == [('new', None), ('new', 't3_p1')]
+    assert scheduler.retried == 1
+
+
+def test_iter_new_gives_up_after_the_retries(sss, no_sleep):
+    reddit = FakeReddit([fake_post(f'p{i}', T0 - i) for i in range(5)])
+    reddit.fail = [1, 1, 1]
+    scheduler = sss.RequestScheduler(None, 2)
+    with pytest.raises(sss.prawcore.exceptions.ServerError):
+        list(sss.iter_new(reddit, 'test', scheduler, 5))
+    assert reddit.calls == [('new', None), ('new', 't3_p0'),
+                            ('new', 't3_p0')]
+
+
+def test_backoff_waits_at_least_retry_after(sss, no_sleep):
+    scheduler = sss.RequestScheduler(None, 5)
+    error = sss.prawcore.exceptions.TooManyRequests(SimpleNamespace(
+        status_code=429, headers={'retry-after': '7'}, text=''))
+    scheduler.backoff(0, error)
+    assert no_sleep[0] >= 7
+    assert scheduler.retried == 1
+    assert scheduler.telemetry()['waited'] == no_sleep[0]
+
+
+def test_backoff_grows_and_reraises(sss, monkeypatch, no_sleep):
+    monkeypatch.setattr(sss.random, 'uniform', lambda low, high: high)
+    scheduler = sss.RequestScheduler(None, 3)
+    error = sss.prawcore.exceptions.ServerError(
+        SimpleNamespace(status_code=503, headers={}))
+    for attempt in range(3):
+        scheduler.backoff(attempt, error)
+    assert no_sleep == [sss.BACKOFF_BASE * 2 ** attempt
+                        for attempt in range(3)]
+    with pytest.raises(sss.prawcore.exceptions.ServerError):
+        scheduler.backoff(3, error)
+
+
+def test_call_retries_server_errors(sss, no_sleep):
+    scheduler = sss.RequestScheduler(None, 5)
+    error = sss.prawcore.exceptions.ServerError(
+        SimpleNamespace(status_code=502, headers={}))
+    results = [error, error, 'ok']
+
+    def flaky():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert scheduler.call(flaky) == 'ok'
+    assert scheduler.retried == 2
+    assert scheduler.requests == 3
@@ -0,0 +1,110 @@
+import pytest
+
+from conftest import FakeReddit, fake_comment, fake_post
+
+# 2021-01-01 00:00 UTC
+T0 = 1_609_459_200
+HOUR = 3600
+
+
+@pytest.fixture
+def reddit():
+    # p0 by a and p1 by b on 210101, each with a comment of its first page
+    posts = [fake_post('p0', T0 + 20 * HOUR, score=10, author='a'),
+             fake_post('p1', T0 + 10 * HOUR, score=5, author='b')]
+    posts[0].comments = [fake_comment('c0', 'p0', T0 + 21 * HOUR)]
+    posts[1].comments = [fake_comment('c1', 'p1', T0 + 11 * HOUR)]
+    return FakeReddit(posts, [fake_comment('c0', 'p0', T0 + 21 * HOUR)])
+
+
+@pytest.fixture
+def watch(sss, reddit, tmp_path, monkeypatch):
+    monkeypatch.setattr(sss.args, 'out', str(tmp_path / 'out.txt'))
+    monkeypatch.setattr(sss.args, 'from_date', 210101)
+    monkeypatch.setattr(sss.args, 'to_date', 210101)
+    monkeypatch.setattr(sss.args, 'submissions', 1000)
+    monkeypatch.setattr(sss.args, 'comments', 10)
+    monkeypatch.setattr(sss.args, 'workers', 1)
+    monkeypatch.setattr(sss.args, 'retries', 0)
+    monkeypatch.setattr(sss.time, 'time', lambda: T0 + 48 * HOUR)
+    monkeypatch.setattr(sss.time, 'sleep', lambda seconds: None)
+    return sss.SubWatch('test')
+
+
+def run(sss, reddit, watch, first_pass=False):
+    clients = sss.RedditClients(lambda: reddit)
+    scheduler = sss.RequestScheduler(reddit, 0)
+    if first_pass:
+        return sss.sub_pipeline(clients, 'test', scheduler, watch=watch)
+    return watch.tick(clients, scheduler)
+
+
+def comment(reddit, com_id, sub_id, score=1):
+    reddit.stream.insert(0, fake_comment(com_id, sub_id, T0 + 30 * HOUR,
+                                         score=score))
+
+
+def test_tick_retries_a_first_pass_that_never_started(sss, reddit, watch):
+    reddit.fail = [0]
+    with pytest.raises(SystemExit):
+        run(sss, reddit, watch, first_pass=True)
+    assert watch.submissions is None
+    summary = run(sss, reddit, watch)
+    assert summary['submissions'] == 2 and summary['comments'] == 2
+    assert watch.submissions.id == ['p1', 'p0']
+    assert watch.marked
+
+
+def test_comment_stream_is_only_read_with_comment_stats(sss, reddit, watch,
+                                                        monkeypatch):
+    monkeypatch.setattr(sss.args, 'comments', 0)
+    run(sss, reddit, watch, first_pass=True)
+    comment(reddit, 'c2', 'p0')
+    summary = run(sss, reddit, watch)
+    assert summary['comments'] is None
+    assert [kind for kind, _ in reddit.calls] == ['new', 'new']
+    assert not watch.marked
+
+
+def test_first_pass_reports_before_marking_the_stream(sss, reddit, watch,
+                                                      monkeypatch):
+    order = []
+    report, poll = sss.sub_report, sss.SubWatch.poll
+
+    def reporting(*args):
+        order.append('report')
+        return report(*args)
+
+    def polling(self, *args):
+        order.append('poll')
+        return poll(self, *args)
+    monkeypatch.setattr(sss, 'sub_report', reporting)
+    monkeypatch.setattr(sss.SubWatch, 'poll', polling)
+    run(sss, reddit, watch, first_pass=True)
+    assert order == ['report', 'poll']
+    assert [kind for kind, _ in reddit.calls] == ['new', 'comments']
+
+
+def test_ticks_accumulate_comments_scores_and_coverage(sss, reddit, watch):
+    run(sss, reddit, watch, first_pass=True)
+    assert watch.coverage == {'p0': (1, 10), 'p1': (1, 10)}
+    assert dict(watch.stats.tot_scores) == {'a': 10, 'b': 5,
+                                            'commenter': 2}
+    # Two new comments on p0 and p0 voted up
+    comment(reddit, 'c2', 'p0', score=3)
+    comment(reddit, 'c3', 'p0')
+    reddit.posts[0].score = 12
+    summary = run(sss, reddit, watch)
+    assert summary['comments'] == 4
+    assert watch.coverage == {'p0': (3, 10), 'p1': (1, 10)}
+    assert dict(watch.stats.tot_scores) == {'a': 12, 'b': 5,
+                                            'commenter': 6}
+    # A comment on p1, which changes hands, p0 voted down
+    comment(reddit, 'c4', 'p1')
+    reddit.posts[0].score = 7
+    reddit.posts[1].author = 'c'
+    summary = run(sss, reddit, watch)
+    assert summary['comments'] == 5
+    assert watch.coverage == {'p0': (3, 10), 'p1': (2, 10)}
+    assert {author: score for author, score in watch.stats.tot_scores.items()
+            if score} == {'a': 7, 'c': 5, 'commenter': 7}
@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import FakeReddit, fake_post
+
+# 2021-01-01 00:00 UTC
+T0 = 1_609_459_200
+HOUR = 3600
+
+
+@pytest.fixture
+def reddit():
+    # Every 6 hours from 210101 23:00 back: p0-p3 on 210101, p4-p7 on
+    # 201231, p8-p11 on 201230
+    return FakeReddit([fake_post(f'p{i}', T0 + 23 * HOUR - i * 6 * HOUR)
+                       for i in range(12)])
+
+
+@pytest.fixture
+def window(sss, monkeypatch):
+    monkeypatch.setattr(sss.args, 'submissions', 1000)
+    monkeypatch.setattr(sss.time, 'time', lambda: T0 + 240 * HOUR)
+
+    def window(from_date, to_date):
+        monkeypatch.setattr(sss.args, 'from_date', from_date)
+        monkeypatch.setattr(sss.args, 'to_date', to_date)
+    return window
+
+
+@pytest.fixture
+def cache(sss, tmp_path):
+    cache = sss.SubCache(str(tmp_path / 'cache.db'), 24)
+    yield cache
+    cache.close()
+
+
+def listed(sss, reddit, cache=None):
+    reddit.served = 0
+    submissions, reached = sss.sub_submissions(
+        reddit, 'test', sss.RequestScheduler(reddit, 0), cache)
+    return submissions.id, reached, reddit.served
+
+
+def test_paging_stops_at_the_from_date(sss, reddit, window):
+    window(201231, 201231)
+    assert listed(sss, reddit) == (['p4', 'p5', 'p6', 'p7'], True, 9)
+
+
+def test_window_without_an_older_post_is_not_reached(sss, reddit, window):
+    window(201229, 201230)
+    assert listed(sss, reddit) == (['p8', 'p9', 'p10', 'p11'], False, 12)
+
+
+def test_cached_span_stops_paging_at_the_window(sss, reddit, window, cache):
+    window(201231, 201231)
+    assert listed(sss, reddit, cache) == (['p4', 'p5', 'p6', 'p7'], True, 9)
+    # p4 is settled and the span paged last time reaches the from date, so
+    # p5-p7 come from the cache without being listed
+    assert listed(sss, reddit, cache) == (['p4', 'p5', 'p6', 'p7'], True, 5)
+
+
+def test_cached_span_cut_by_the_limit_is_not_reached(sss, reddit, window,
+                                                     cache, monkeypatch):
+    window(201231, 210101)
+    listed(sss, reddit, cache)
+    monkeypatch.setattr(sss.args, 'submissions', 6)
+    assert listed(sss, reddit, cache) == (
+        ['p0', 'p1', 'p2', 'p3', 'p4', 'p5'], False, 1)
+
+
+def test_span_short_of_the_from_date_keeps_paging(sss, reddit, window,
+                                                   cache):
+    window(210101, 210101)
+    assert listed(sss, reddit, cache) == (['p0', 'p1', 'p2', 'p3'], True, 5)
+    # The cached span ends at p4, an older window must be paged through
+    window(201231, 201231)
+    assert listed(sss, reddit, cache) == (['p4', 'p5', 'p6', 'p7'], True, 9)
@@ -0,0 +1,106 @@
+import csv
+import json
+
+import pytest
+
+TOTALS = {'submissions': 2, 'comments': 3, 'listed_comments': 4,
+          'unique_commenters': 2, 'awards': 1}
+TABLES = {'authors': (['author', 'comments'], [['a', 2], ['b', 1]]),
+          'days': (['day', 'comments'], [])}
+
+
+@pytest.fixture
+def report(sss, monkeypatch):
+    monkeypatch.setattr(sss.args, 'from_date', 201231)
+    monkeypatch.setattr(sss.args, 'to_date', 210101)
+    monkeypatch.setattr(sss.args, 'comments', 100)
+    sections = [
+        sss.ReportSection('Top Submitters', '\n## Top Submitters\n',
+                          '{0}. **{2}** submissions by u/{1}\n', (),
+                          [('a', 2)], comments=False),
+        sss.ReportSection('Top Commenters', '\n## Top Commenters\n',
+                          '{0}. **{2}** comments by u/{1}\n', (),
+                          [('a', 2), ('b', 1)])]
+    return sss.Report('test', dict(TOTALS), sections, dict(TABLES))
+
+
+def test_report_writer_needs_write(sss, tmp_path):
+    with pytest.raises(TypeError):
+        sss.ReportWriter(str(tmp_path / 'out.txt'))
+
+
+def test_markdown(sss, report, tmp_path):
+    out = tmp_path / 'out.txt'
+    assert sss.MarkdownWriter(str(out)).write(report) == [str(out)]
+    text = out.read_text()
+    assert text.startswith('# r/test Subreddit Stats for 201231-210101\n')
+    assert 'Total Comments: **3**\n' in text
+    assert 'Unique Commenters: **2**' in text
+    assert '1. **2** submissions by u/a\n' in text
+    assert '2. **1** comments by u/b\n' in text
+    assert [path.name for path in tmp_path.iterdir()] == ['out.txt']
+
+
+def test_markdown_without_comments(sss, report, tmp_path, monkeypatch):
+    monkeypatch.setattr(sss.args, 'comments', 0)
+    report.totals.update(comments=None, unique_commenters=None)
+    out = tmp_path / 'out.txt'
+    sss.MarkdownWriter(str(out)).write(report)
+    text = out.read_text()
+    assert 'Total Comments: **4** (listed by reddit)' in text
+    assert 'Unique Commenters' not in text
+    assert 'Top Submitters' in text and 'Top Commenters' not in text
+
+
+def test_summary_lists_uncounted_comments(sss, tmp_path, monkeypatch):
+    monkeypatch.setattr(sss.args, 'from_date', 201231)
+    monkeypatch.setattr(sss.args, 'to_date', 210101)
+    summary = dict(TOTALS, top_post='post', out='out.txt')
+    path = tmp_path / 'summary.md'
+    sss.write_summary(str(path), [('a', summary),
+                                  ('b', dict(summary, comments=None)),
+                                  ('c', None)])
+    rows = path.read_text().splitlines()[-3:]
+    assert rows == ['| r/a | 2 | 3 | 1 | post | out.txt |',
+                    '| r/b | 2 | 4 (listed) | 1 | post | out.txt |',
+                    '| r/c | | | | failed | |']
+
+
+def test_json(sss, report, tmp_path):
+    paths = sss.JsonWriter(str(tmp_path / 'out.txt')).write(report)
+    assert paths == [str(tmp_path / 'out.json')]
+    data = json.loads((tmp_path / 'out.json').read_text())
+    assert (data['subreddit'], data['from_date'], data['to_date']) == \
+        ('test', 201231, 210101)
+    assert data['tables'] == {
+        'authors': {'columns': ['author', 'comments'],
+                    'rows': [['a', 2], ['b', 1]]},
+        'days': {'columns': ['day', 'comments'], 'rows': []}}
+
+
+def test_csv(sss, report, tmp_path):
+    paths = sss.CsvWriter(str(tmp_path / 'out.txt')).write(report)
+    assert paths == [str(tmp_path / 'out_authors.csv'),
+                     str(tmp_path / 'out_days.csv')]
+    with open(paths[0], newline='') as f:
+        assert list(csv.reader(f)) == [['author', 'comments'], ['a', '2'],
+                                       ['b', '1']]
+    with open(paths[1], newline='') as f:
+        assert list(csv.reader(f)) == [['day', 'comments']]
+
+
+def test_parquet(sss, report, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    paths = sss.ParquetWriter(str(tmp_path / 'out.txt')).write(report)
+    assert paths == [str(tmp_path / 'out_authors.parquet'),
+                     str(tmp_path / 'out_days.parquet')]
+    table = parquet.read_table(paths[0])
+    assert table.to_pydict() == {
+        'author': ['a', 'b'], 'comments': [2, 1],
+        'subreddit': ['test', 'test'], 'from_date': [201231, 201231],
+        'to_date': [210101, 210101]}
+    assert table.schema.metadata[b'subreddit'] == b'test'
+    empty = parquet.read_table(paths[1])
+    assert empty.num_rows == 0
+    assert empty.column_names == ['day', 'comments', 'subreddit',
+                                  'from_date', 'to_date']